@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+import sys
+
+from wim.frame import PROFILES, ACCURATE, FAST
+from wim.evaluation import evaluate_profiles
+from optparse import make_option
+from simpleconsole import ConsoleError, ConsoleProgram
+
+class WimEval(ConsoleProgram):
+
+    opts = ConsoleProgram.opts + (
+        make_option('-r', '--repeat', metavar='INT', default=3, dest='repeat', action='store', type='int',
+            help='Set the number of timed passes over the examples'),
+    )
+
+    help = 'Evaluate the analysis profiles against the example parses of the knowledge.'
+    args = '[PROFILE ...]'
+
+    version = ('1', '0', '0')
+
+    def handle(self, *args, **opts):
+
+        self.verbosity = int(opts.get('verbosity', 1))
+        profiles = args or (ACCURATE, FAST)
+
+        for profile in profiles:
+            if profile not in PROFILES:
+                raise ConsoleError("Unknown profile %s, choose from %s" % (profile, ", ".join(sorted(PROFILES))))
+
+        if self.verbosity > 1:
+            print "Evaluating profiles..."
+
+        output = []
+        for result in evaluate_profiles(profiles, repeat=int(opts.get('repeat', 3))):
+            output.append("%(profile)-10s %(frames)i/%(examples)i frames (%(accuracy)0.3f), "
+                          "%(agreement)0.3f agreement with accurate, %(time)0.3f seconds" % result)
+        return "\n".join(output) + "\n"
+
+if __name__ == "__main__":
+    WimEval().load(sys.argv)
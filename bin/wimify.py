@@ -9,7 +9,8 @@ from wim.utils import *
 from nltk.tree import Tree
 from optparse import make_option
 from wim.wookie import WookieTree
-from wim.analyze import WIMAnalyzer
+from wim.analyze import WIMAnalyzer, analyze_stream
+from wim.utils.options import ANALYZER_OPTIONS, analyzer_options
 from meridian.reader import Sentence
 from simpleconsole import ConsoleError, ConsoleProgram
 
@@ -25,10 +26,14 @@ class Wimify(ConsoleProgram):
             help='Set the class of the parser to use- use module dot notation'),
         make_option('-i', '--index', metavar='INT', default=1, dest='index', action='store', type='int',
             help='Set the index for the output of the JSON file'),
-    )
+        make_option('-s', '--stream', default=False, dest='stream', action='store_true',
+            help='Analyze one flattened parse per line of the files (or stdin) and write one JSON object per line'),
+        make_option('-p', '--provenance', default=False, dest='provenance', action='store_true',
+            help='Add the candidate, tried and chosen templates of every verb phrase to the output'),
+    ) + ANALYZER_OPTIONS
 
     help = 'Parse and analyze a WIM from a sentence on the command line.'
-    args = 'SENTENCE'
+    args = 'SENTENCE | --stream [PATH ...]'
 
     version = ('1', '0', '0')
 
@@ -37,6 +42,12 @@ class Wimify(ConsoleProgram):
         self.verbosity   = int(opts.get('verbosity', 1))
         self.grammarfile = opts.get('grammar', DEFAULT_GRAMMAR)
         self.parserclass = class_from_string(opts.get('parser', DEFAULT_PARSER))
+        self.options     = analyzer_options(opts)
+
+        self.provenance  = opts.get('provenance', False)
+
+        if opts.get('stream', False):
+            return self.stream(args or ['-'], int(opts.get('index', 1)))
 
         if len(args) != 1:
             raise ConsoleError("Specificy a sentence surrounded in double quotes to parse and analyze")
@@ -57,6 +68,29 @@ class Wimify(ConsoleProgram):
         output = "%s\n" % json.dumps(self.output, ensure_ascii=False, indent='    ')
         return output
 
+    def stream(self, paths, index=1):
+        """
+        Writes a JSON line for every parse line of the files, reading
+        stdin for a path of "-". A single analyzer is used throughout and
+        lines are written as they are analyzed, so memory stays constant
+        however large the corpus is.
+        """
+        analyzer = WIMAnalyzer(**self.options)
+
+        for path in paths:
+            infile = sys.stdin if path == '-' else open(path, 'rb')
+            try:
+                # readline rather than file iteration, which reads ahead on pipes
+                for output in analyze_stream(iter(infile.readline, ''), analyzer, index, self.provenance):
+                    sys.stdout.write("%s\n" % json.dumps(output, ensure_ascii=False))
+                    sys.stdout.flush()
+                    index = output['index'] + 1
+            finally:
+                if infile is not sys.stdin:
+                    infile.close()
+
+        return ""
+
     def parse(self):
         
         sentence = Sentence(self.output['text'])
@@ -90,14 +124,18 @@ class Wimify(ConsoleProgram):
             start = time.time()
             
 #            analyzer = WIMAnalyzer(self.output['parse'])
-            analyzer = WIMAnalyzer(self.output['wookie_parse'])
-            wim = analyzer.analyze()
+            analyzer = WIMAnalyzer(**self.options)
+            wim = analyzer.analyze(self.output['wookie_parse'])
 
             finit = time.time()
             delta = finit - start
 
             self.output['wim'] = wim.serialize()
             self.output['wim_time'] = delta
+            if wim.usage is not None:
+                self.output['wim_budget'] = wim.usage
+            if self.provenance:
+                self.output['wim_provenance'] = wim.provenance
 
         else:
             self.output['wim'] = {}
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+import sys
+import time
+
+from optparse import make_option
+from wim.frame import Knowledge, ACCURATE, PROFILES
+from simpleconsole import ConsoleError, ConsoleProgram
+
+class WimKB(ConsoleProgram):
+
+    opts = ConsoleProgram.opts + (
+        make_option('-p', '--profile', metavar='PROFILE', default=None, dest='profiles', action='append',
+            help='Compile the templates of an analysis profile, accurate by default (repeatable)'),
+        make_option('-e', '--parses', default=False, dest='parses', action='store_true',
+            help='Keep the example parses of the mappings'),
+    )
+
+    help = 'Compile the knowledge in $WIMKB (or INPUT) into a binary knowledge base that can be used as $WIMKB.'
+    args = 'OUTPUT [INPUT]'
+
+    version = ('1', '0', '0')
+
+    def handle(self, *args, **opts):
+
+        self.verbosity = int(opts.get('verbosity', 1))
+
+        if len(args) not in (1, 2):
+            raise ConsoleError("Specify the path to write the compiled knowledge to")
+
+        profiles = opts.get('profiles', None) or [ACCURATE]
+        for profile in profiles:
+            if profile not in PROFILES:
+                raise ConsoleError("Unknown analysis profile %r" % profile)
+
+        if self.verbosity > 1:
+            print "Compiling knowledge..."
+
+        start     = time.time()
+        knowledge = Knowledge.read(args[1] if len(args) > 1 else None)
+        size      = knowledge.save(args[0], profiles, opts.get('parses', False))
+        delta     = time.time() - start
+
+        return "Wrote %i frames (%i bytes) to %s in %0.3f seconds\n" % (len(knowledge), size, args[0], delta)
+
+if __name__ == "__main__":
+    WimKB().load(sys.argv)
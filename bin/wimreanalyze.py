@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+import sys
+import json
+
+from optparse import make_option
+from wim.frame import Knowledge, VerbTemplate
+from wim.analyze import WIMAnalyzer
+from wim.reanalysis import reanalyze
+from wim.utils.options import ANALYZER_OPTIONS, analyzer_options
+from simpleconsole import ConsoleError, ConsoleProgram
+
+class WimReanalyze(ConsoleProgram):
+
+    opts = ConsoleProgram.opts + (
+        make_option('-k', '--previous', metavar='PATH', default=None, dest='previous', action='store',
+            help='Set the path to the verbframes.json that the results were analyzed with'),
+    ) + ANALYZER_OPTIONS
+
+    help = 'Update the output of wimify --stream --provenance for the knowledge in $WIMKB, reanalyzing only the parses whose candidate templates changed. Pass the analyzer options of the original run; results analyzed with other options are all reanalyzed.'
+    args = 'PARSES RESULTS'
+
+    version = ('1', '0', '0')
+
+    def handle(self, *args, **opts):
+
+        self.verbosity = int(opts.get('verbosity', 1))
+
+        if len(args) != 2:
+            raise ConsoleError("Specify the parses and the results that wimify wrote for them")
+
+        diff = None
+        if opts.get('previous', None):
+            diff = Knowledge.read(opts['previous']).diff(VerbTemplate.knowledge)
+            if self.verbosity > 1:
+                for key in ('added', 'removed', 'changed'):
+                    for frame in sorted(diff[key]):
+                        sys.stderr.write("%s %s\n" % (key, frame))
+
+        analyzer = WIMAnalyzer(**analyzer_options(opts))
+        total    = 0
+        redone   = 0
+
+        with open(args[0], 'rb') as parses:
+            with open(args[1], 'rb') as results:
+                records = (json.loads(line) for line in results)
+                for record, reanalyzed in reanalyze(parses, records, analyzer, diff):
+                    sys.stdout.write("%s\n" % json.dumps(record, ensure_ascii=False))
+                    total  += 1
+                    redone += reanalyzed
+
+        sys.stderr.write("Reanalyzed %i of %i parses\n" % (redone, total))
+        return ""
+
+if __name__ == "__main__":
+    WimReanalyze().load(sys.argv)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+import sys
+import time
+
+from wim.verbtable import build
+from simpleconsole import ConsoleError, ConsoleProgram
+
+class WimTable(ConsoleProgram):
+
+    opts = ConsoleProgram.opts
+
+    help = 'Compile the WordNet verb lemmas and the knowledge into a verb table for $WIMTABLE.'
+    args = 'OUTPUT'
+
+    version = ('1', '0', '0')
+
+    def handle(self, *args, **opts):
+
+        self.verbosity = int(opts.get('verbosity', 1))
+
+        if len(args) != 1:
+            raise ConsoleError("Specify the path to write the verb table to")
+
+        if self.verbosity > 1:
+            print "Building verb table..."
+
+        start = time.time()
+        count = build(args[0])
+        delta = time.time() - start
+
+        return "Wrote %i verb lemmas to %s in %0.3f seconds\n" % (count, args[0], delta)
+
+if __name__ == "__main__":
+    WimTable().load(sys.argv)
@@ -12,8 +12,10 @@ config = {
     'author_email': 'benjamin@bengfort.com',
     'version': '1.0',
     'install_requires': ['nose', 'nltk'],
-    'packages:': ['wim'],
-    'scripts': ['bin/wimify.py', ],
+    'packages': ['wim', 'wim.utils', 'wim.data'],
+    'package_dir': {'wim.data': 'data'},
+    'package_data': {'wim.data': ['verbframes.json']},
+    'scripts': ['bin/wimify.py', 'bin/wimtable.py', 'bin/wimkb.py', 'bin/wimeval.py', 'bin/wimreanalyze.py', ],
     'name': 'WIM Analyzer'
 }
 
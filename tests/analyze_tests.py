@@ -0,0 +1,221 @@
+import sys
+sys.path.append("../")
+
+import unittest
+
+from nltk.tree import Tree
+from wim.frame import FAST
+from wim.phrase import BasePhrase, NounPhrase
+from wim.evaluation import evaluate_profiles
+from wim.lexicon import VerbLexicon
+from wim.analyze import WIMAnalyzer, AUXILIARIES, analyze_parallel, analyze_stream, analyze_threaded
+
+from corpus import example_parses
+
+# Corpus trees with the relations of the frames of their WIMs, as the
+# analyzer has always produced them
+REGRESSIONS = (
+    ("(S (CL (NP (N (PRO (PRP He)))) (VP (V (VBZ falls)))) (PUNCT .))",
+     {'falls-1': {'HEAD': 'falls-1', 'AGENT': 'He-1'}}),
+    ("(S (CL (NP (DET The) (N (NN man))) (VP (V (VBD hit)) (NP (DET the) (N (NN woman))))) (PUNCT .))",
+     {'hit-1': {'HEAD': 'hit-1', 'AGENT': 'man-1', 'THEME': 'woman-1'}}),
+    ("(S (CL (NP (N (PRO (PRP She)))) (VP (V (VBD sent)) (NP (N (PRO (POSSPRO (PRPS her)))) (N (NNS kids))) "
+     "(PP (TO to) (NP (N (NN camp)))))) (PUNCT .))",
+     {'sent-1': {'HEAD': 'sent-1', 'AGENT': 'She-1', 'THEME': 'her-1', 'SCOPE': 'to camp-1'}}),
+    ("(S (CL (NP (N (PRO (PRP He)))) (VP (V (VBD gave)) (NP (N (PRO (PRP her)))) (NP (DET a) (N (NN ring))))) (PUNCT .))",
+     {'gave-1': {'HEAD': 'gave-1', 'AGENT': 'He-1', 'BENEFICIARY': 'her-1', 'THEME': 'ring-1'}}),
+    ("(S (CL (NP (N (PRO (PRP She)))) (VP (V (VBD proved)) (PP (PREP (IN that)) (CL (NP (N (PRO (PRP she)))) "
+     "(VP (MD could) (VP (V (VB jump)) (ADJP (ADJ (JJ high))))))))) (PUNCT .))",
+     {'proved-1': {'HEAD': 'proved-1', 'AGENT': 'She-1', 'THEME': 'she could jump high-1'},
+      'jump-1': {'HEAD': 'jump-1', 'AGENT': 'she-1'}}),
+    ("(S (CL (NP (N (PRO (PRP They)))) (VP (V (VBD talked)) (NP (N (PRO (PRP him)))) (PP (PREP (IN into)) "
+     "(CL (VP (V (VBG writing)) (NP (DET the) (N (NN letter)))))))) (PUNCT .))",
+     {'talked-1': {'HEAD': 'talked-1', 'AGENT': 'They-1', 'THEME': 'into writing the letter-1'}}),
+)
+
+def relations(wim):
+    """
+    The relations of every frame of the serialized WIM that has any.
+    """
+    result = {}
+    for frame, properties in wim.items():
+        roles = dict((role, value) for role, value in properties.items() if role != 'fromtext')
+        if roles:
+            result[frame] = roles
+    return result
+
+class TestAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        self.parses = example_parses()
+
+    def test_regression(self):
+        for analyzer in (WIMAnalyzer(), WIMAnalyzer(matchcache=True)):
+            for parse, expected in REGRESSIONS * 2:
+                self.assertEqual(relations(analyzer.analyze(parse).serialize()), expected)
+
+    def test_analyze_many(self):
+        analyzer = WIMAnalyzer()
+        expected = [WIMAnalyzer(parse).analyze().serialize() for parse in self.parses]
+        results  = [wim.serialize() for wim in analyzer.analyze_many(self.parses)]
+        self.assertEqual(results, expected)
+
+    def test_ranked_evaluation(self):
+        expected = [WIMAnalyzer(parse).analyze().serialize() for parse in self.parses]
+
+        for reorder in (False, True):
+            analyzer = WIMAnalyzer(reorder=reorder)
+            results  = [wim.serialize() for wim in analyzer.analyze_many(self.parses * 2)]
+            self.assertEqual(results, expected * 2)
+
+    def test_early_termination(self):
+        analyzer   = WIMAnalyzer()
+        exhaustive = 0
+        for parse in self.parses:
+            tree = analyzer.phrase(parse)
+            analyzer.analyze(tree)
+            exhaustive += sum(len(analyzer.candidates(vp)) for vp in analyzer.rootVPs(tree))
+        self.assertLess(analyzer.trials, exhaustive)
+
+    def test_senses(self):
+        # The match keeps every synset that proposed its template
+        analyzer = WIMAnalyzer()
+        tree     = analyzer.phrase("(S (CL (NP (N (NNP John))) (VP (V (VBD hit)) (NP (DET the) (N (NN ball))))) (PUNCT .))")
+        vp,      = analyzer.rootVPs(tree)
+        proposed = analyzer.candidates(vp)
+        match    = analyzer.evaluate(vp, proposed, {})
+
+        self.assertEqual(match.senses, tuple(proposed[match.template]))
+        self.assertGreater(len(match.senses), 1)
+        self.assertEqual(match.sense, match.senses[0])
+
+    def test_timing(self):
+        analyzer = WIMAnalyzer()
+        list(analyzer.analyze_many(self.parses))
+        self.assertEqual(analyzer.predicates, {})
+
+        analyzer = WIMAnalyzer(timing=True)
+        list(analyzer.analyze_many(self.parses))
+        self.assertGreater(sum(calls for calls, seconds in analyzer.predicates.values()), 0)
+
+    def test_skipping(self):
+        expected = [WIMAnalyzer(parse).analyze().serialize() for parse in self.parses]
+        analyzer = WIMAnalyzer(consumed=True, auxiliaries=AUXILIARIES)
+        results  = [wim.serialize() for wim in analyzer.analyze_many(self.parses)]
+        self.assertEqual(results, expected)
+        self.assertGreater(analyzer.stats.skipped, 0)
+
+        parse    = "(S (CL (NP (DET The) (N (NN ball))) (VP (V (VBZ is)) (VP (V (VBG falling)) (PP (PREP (IN on)) (NP (DET the) (N (NN table))))))) (PUNCT .))"
+        tree     = analyzer.phrase(parse)
+        outer, inner = list(analyzer.rootVPs(tree))[:2]
+        self.assertFalse(analyzer.skip(outer))
+        self.assertTrue(analyzer.skip(inner))
+        self.assertFalse(WIMAnalyzer().skip(inner))
+
+    def test_selective(self):
+        lexicon  = VerbLexicon()
+        analyzer = WIMAnalyzer(lexicon=lexicon, lemmas=["fall"], relations=["AGENT", "THEME"])
+        parse    = "(S (CL (NP (DET The) (N (NN ball))) (VP (V (VBZ is)) (VP (V (VBG falling)) (PP (PREP (IN on)) (NP (DET the) (N (NN table))))))) (PUNCT .))"
+        tree     = analyzer.phrase(parse)
+        outer, inner = list(analyzer.rootVPs(tree))[:2]
+        self.assertTrue(analyzer.skip(outer))
+        self.assertFalse(analyzer.skip(inner))
+
+        analyzer.analyze(tree)
+        self.assertEqual(analyzer.stats.skipped, 1)
+        self.assertEqual([text for text, senses in lexicon.cache.items()], ["falling"])
+
+        for parse in self.parses:
+            for frame in WIMAnalyzer(relations=["AGENT"]).analyze(parse).serialize().values():
+                self.assertLessEqual(set(frame), set(["AGENT", "fromtext"]))
+
+        self.assertIn("went", lexicon.base_forms("went"))
+        self.assertIn("go", lexicon.base_forms("went"))
+        self.assertIn("carry", lexicon.base_forms("carries"))
+
+    def test_budgets(self):
+        expected = [WIMAnalyzer(parse).analyze().serialize() for parse in self.parses]
+        analyzer = WIMAnalyzer(matchcache=True)
+
+        for parse, wim in zip(self.parses, expected):
+            result = analyzer.analyze(parse, max_trials=1000)
+            self.assertEqual(result.serialize(), wim)
+            self.assertFalse(result.truncated)
+            self.assertFalse(result.usage['truncated'])
+
+            for budget in ({'max_trials': 0}, {'timeout': 0}):
+                result = analyzer.analyze(parse, **budget)
+                self.assertTrue(result.truncated)
+                self.assertTrue(result.usage['truncated'])
+                self.assertEqual(result.usage['trials'], 0)
+                self.assertLessEqual(len(result.serialize()), len(wim))
+
+        # Truncated analyses leave nothing behind in the match cache
+        results = [wim.serialize() for wim in analyzer.analyze_many(self.parses)]
+        self.assertEqual(results, expected)
+        self.assertIsNone(analyzer.analyze(self.parses[0]).usage)
+
+        records = list(analyze_stream(self.parses[:2], WIMAnalyzer(max_trials=0)))
+        self.assertTrue(all(record['wim_budget']['truncated'] for record in records))
+
+    def test_fast_profile(self):
+        analyzer = WIMAnalyzer(profile=FAST)
+        self.assertEqual(analyzer.profile, FAST)
+        self.assertRaises(ValueError, WIMAnalyzer, lexicon=VerbLexicon(), profile=FAST)
+
+        def synmatch(self, classifier):
+            raise AssertionError("WordNet consulted by the fast profile")
+
+        original = NounPhrase.synmatch
+        NounPhrase.synmatch = synmatch
+        try:
+            for parse in self.parses:
+                analyzer.analyze(parse)
+            WIMAnalyzer(profile=FAST, matchcache=True).analyze(self.parses[0])
+        finally:
+            NounPhrase.synmatch = original
+
+        accurate, fast = evaluate_profiles(repeat=1)
+        self.assertEqual(accurate['agreement'], 1.0)
+        self.assertEqual(fast['examples'], len(self.parses))
+        self.assertLessEqual(fast['agreement'], 1.0)
+
+    def test_inputs(self):
+        parse    = self.parses[0]
+        analyzer = WIMAnalyzer()
+        expected = analyzer.analyze(parse).serialize()
+
+        for tree in (Tree.parse(parse), BasePhrase(parse)):
+            self.assertEqual(analyzer.analyze(tree).serialize(), expected)
+
+    def test_analyze_parallel(self):
+        expected = [WIMAnalyzer(parse).analyze().serialize() for parse in self.parses]
+        memory   = {}
+        results  = list(analyze_parallel(self.parses, 2, 4, memory=memory))
+        self.assertEqual(results, expected)
+
+        # Only workers that were given trees are sampled
+        self.assertIn(len(memory), (1, 2))
+        for usage in memory.values():
+            self.assertGreater(usage['rss'], 0)
+
+    def test_analyze_threaded(self):
+        expected = [WIMAnalyzer(parse).analyze().serialize() for parse in self.parses]
+        analyzer = WIMAnalyzer(lexicon=VerbLexicon())
+        results  = [wim.serialize() for wim in analyze_threaded(self.parses * 4, 8, analyzer)]
+        self.assertEqual(results, expected * 4)
+        self.assertEqual(analyzer.lexicon.hits + analyzer.lexicon.misses,
+                         sum(len(list(analyzer.rootVPs(analyzer.phrase(p)))) for p in self.parses) * 4)
+
+    def test_analyze_stream(self):
+        lines    = [parse + "\n" for parse in self.parses[:10]] + ["\n"]
+        expected = [WIMAnalyzer(parse).analyze().serialize() for parse in self.parses[:10]] + [{}]
+        records  = list(analyze_stream(lines, index=5))
+
+        self.assertEqual([record['wim'] for record in records], expected)
+        self.assertEqual([record['index'] for record in records], range(5, 16))
+        for record in records:
+            self.assertEqual(sorted(record), ['index', 'wim', 'wim_time'])
+
+    def test_empty(self):
+        self.assertEqual(WIMAnalyzer().analyze("").serialize(), {})
@@ -0,0 +1,97 @@
+"""
+Measures what every extra mapping of a frame costs the search for the
+bindings of a verb phrase. Each frame of the knowledge is given EXTRA
+alternative mappings, made like the ADJP variants noted in
+data/verbframes.txt by relabelling the last node of its verbmap, and the
+bindings of the candidates of every verb phrase of the example parses are
+found with one walk of the trie, and by searching the verbmap of every
+candidate on its own with a memo shared by the candidates of the phrase.
+
+    python bench_mappings.py [EXTRA] [REPEAT]
+"""
+
+import sys
+sys.path.append("../")
+
+import time
+
+from nltk.tree import Tree
+from wim.frame import Knowledge, VerbTemplate, search_pattern, unique_bindings
+from wim.lexicon import VerbLexicon
+from wim.analyze import WIMAnalyzer
+
+LABELS = ("ADJP", "PP", "NP", "CL", "VP")
+
+def variants(mapping, count):
+    """
+    Yields count alternatives of the mapping with the last node of the
+    verbmap relabelled.
+    """
+    source = mapping['verbmap']
+    node   = max(pos for pos in source.treepositions() if isinstance(source[pos], Tree))
+    label  = source[node].node.split("=")
+    labels = [other for other in LABELS if other != label[0]]
+    for idx in xrange(count):
+        # Only the head annotation is kept, as the others may not apply
+        verbmap = source.copy(deep=True)
+        verbmap[node].node = labels[idx % len(labels)]
+        if len(label) > 1 and "head" in label[1].split(","):
+            verbmap[node].node += "=head"
+        variant = dict(mapping)
+        variant['verbmap'] = verbmap
+        yield variant
+
+def knowledge(extra):
+    mappings = {}
+    for frame, values in VerbTemplate.knowledge.items():
+        mappings[frame] = list(values) + list(variants(values[0], extra))
+    return Knowledge(**mappings)
+
+def benchmark(extra, repeat=3):
+    analyzer = WIMAnalyzer(lexicon=VerbLexicon(knowledge(extra).compile()))
+    index    = analyzer.lexicon.templates
+    trees    = [analyzer.phrase(str(mappings[0]['parse']))
+                for mappings in VerbTemplate.knowledge.values()
+                if mappings[0].get('parse') is not None]
+    phrases  = [[(vp.findparent('CL'), analyzer.candidates(vp)) for vp in analyzer.rootVPs(tree)]
+                for tree in trees]
+
+    trie = naive = None
+    for idx in xrange(repeat):
+        start = time.time()
+        for clauses in phrases:
+            memo = {}
+            for clause, candidates in clauses:
+                index.trie.bindings(clause, candidates, memo)
+        delta = time.time() - start
+        trie  = delta if trie is None else min(trie, delta)
+
+        start = time.time()
+        for clauses in phrases:
+            for clause, candidates in clauses:
+                memo = {}
+                for template in candidates:
+                    unique_bindings(search_pattern(clause, template.pattern[2], memo))
+        delta = time.time() - start
+        naive = delta if naive is None else min(naive, delta)
+
+    vps        = sum(len(clauses) for clauses in phrases)
+    candidates = sum(len(candidates) for clauses in phrases for clause, candidates in clauses)
+    return vps, candidates, trie, naive
+
+if __name__ == "__main__":
+
+    extra  = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print "%-6s %10s %12s %12s %12s %12s" % ("extra", "candidates", "trie ms/vp", "+ms/mapping",
+                                            "each ms/vp", "+ms/mapping")
+    base = None
+    for count in xrange(extra + 1):
+        vps, candidates, trie, naive = benchmark(count, repeat)
+        trie  = trie * 1000 / vps
+        naive = naive * 1000 / vps
+        if base is None:
+            base = (trie, naive)
+        print "%-6i %10i %12.3f %12.3f %12.3f %12.3f" % (count, candidates, trie,
+            (trie - base[0]) / count if count else 0.0, naive, (naive - base[1]) / count if count else 0.0)
@@ -0,0 +1,41 @@
+"""
+Measures the resident memory of each worker of ``analyze_parallel`` to
+show how much of the warm parent state stays shared copy-on-write.
+
+    python bench_parallel.py [WORKERS] [TREES]
+
+TREES is a file with one flattened parse per line; the example parses of
+the knowledge are used if it is omitted.
+"""
+
+import sys
+sys.path.append("../")
+
+import time
+
+from wim.utils import memory_usage
+from wim.analyze import analyze_parallel
+
+from corpus import example_parses
+
+if __name__ == "__main__":
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as treefile:
+            trees = [line.strip() for line in treefile if line.strip()]
+    else:
+        trees = example_parses() * 20
+
+    memory = {}
+    start  = time.time()
+    count  = sum(1 for wim in analyze_parallel(trees, workers, memory=memory))
+    delta  = time.time() - start
+
+    parent = memory_usage()
+    print "%i trees with %i workers in %0.3f seconds" % (count, workers, delta)
+    print
+    print "%-8s %10s %10s %10s" % ("pid", "rss kB", "shared kB", "private kB")
+    print "%-8s %10i %10i %10i" % ("parent", parent['rss'], parent['shared'], parent['private'])
+    for pid, usage in sorted(memory.items()):
+        print "%-8i %10i %10i %10i" % (pid, usage['rss'], usage['shared'], usage['private'])
@@ -0,0 +1,16 @@
+"""
+The example parses of the knowledge, shared by the tests and benchmarks
+that analyze a small corpus.
+"""
+
+import sys
+sys.path.append("../")
+
+from wim.evaluation import examples
+
+def example_parses(knowledge=None):
+    """
+    The flattened example parse of every mapping in the knowledge that
+    has one, in frame order.
+    """
+    return [parse for frame, parse in examples(knowledge)]
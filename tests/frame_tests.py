@@ -24,10 +24,10 @@ class TestFrames(object):
             print "Error: %s" % str(e)
             print parse
         phrase   = list(explorer.findall('VP'))[0]
-        frame    = VerbTemplate(frame, lemma)
+        frame    = VerbTemplate.knowledge.templates.lookup(frame, lemma)
 
-        #assert frame.match(phrase)
-        return str(phrase), frame.match(phrase)
+        #assert frame.match(phrase) is not None
+        return str(phrase), any(template.match(phrase) is not None for template in frame)
 
 if __name__ == "__main__":
 
@@ -0,0 +1,249 @@
+import sys
+sys.path.append("../")
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from nltk.tree import Tree
+
+from wim.frame import Knowledge, LazyKnowledge, VerbTemplate, TemplateMatch, compile_predicates, CHEAP, MEDIUM, EXPENSIVE, ACCURATE, FAST
+from wim.phrase import BasePhrase, NounPhrase, TokenPhrase
+from wim.lexicon import VerbLexicon
+from wim.analyze import WIMAnalyzer
+
+def attempt(method, *args):
+    # Some predicates raise on phrases they were never meant to check
+    try:
+        return method(*args)
+    except ValueError as e:
+        return str(e)
+
+class TestTemplateIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.templates = VerbTemplate.knowledge.templates
+
+    def test_frame_ids(self):
+        self.assertEqual(Knowledge.frameid("Somebody ----s something"), 8)
+        self.assertEqual(Knowledge.frameid("It is ----ing"), 3)
+        self.assertEqual(Knowledge.frameid("Somebody ----s a domain frame"), None)
+
+    def test_byid(self):
+        for frame, templates in self.templates.items():
+            frameid = Knowledge.frameid(frame)
+            self.assertTrue(self.templates.byid[frameid] is templates)
+        self.assertIn(0, self.templates.unsupported)
+
+    def test_lemma_spelling(self):
+        # "thin" is a substring of "Something", which string keys missed
+        senses = VerbLexicon().lookup("thin")
+        frames = set(t.frame for sense in senses for t in sense.templates)
+        self.assertIn("Something ----s", frames)
+
+    def test_trie_bindings(self):
+        # One walk of the trie binds every template as matching each would
+        for mappings in VerbTemplate.knowledge.values():
+            if mappings[0].get('parse') is None: continue
+            sentence = BasePhrase(str(mappings[0]['parse']))
+
+            for vp in sentence.findall('VP'):
+                bindings = self.templates.trie.bindings(vp.findparent('CL'))
+                self.assertEqual(set(bindings), set(self.templates.itertemplates()))
+
+                for template in self.templates.itertemplates():
+                    constituents = [phrase for phrase, bits in bindings[template]]
+                    self.assertEqual(map(id, constituents), map(id, vp.constituents(template.verbmap)))
+
+                    expected = attempt(template.match, vp)
+                    result   = attempt(template.check, vp, bindings[template])
+                    if isinstance(expected, TemplateMatch):
+                        self.assertEqual(map(id, result), map(id, expected.constituents))
+                    else:
+                        self.assertEqual(result, expected)
+
+    def test_all_mappings(self):
+        # Every mapping of a frame is a candidate, not just the first
+        frame    = "Something ----s something Adjective/Noun"
+        mapping  = {
+            'frame': frame,
+            'verbmap': Tree.parse("(CL (NP=subject,something) (VP=head (NP=directobject,something) (ADJP)))"),
+            'wimtemplate': "AGENT HEAD BENEFICIARY THEME",
+        }
+        mappings = dict((key, list(values)) for key, values in VerbTemplate.knowledge.items())
+        mappings[frame].append(mapping)
+        index    = Knowledge(**mappings).compile()
+
+        self.assertEqual([template.mapping for template in index[frame]], [0, 1])
+        self.assertTrue(index.byid[Knowledge.frameid(frame)] is index[frame])
+        self.assertEqual(len(list(index.itertemplates())), len(list(self.templates.itertemplates())) + 1)
+
+        parse    = "(S (CL (NP (DET The) (N (NN shot))) (VP (V (VBD rendered)) (NP (N (PRO (PRP her)))) (ADJP (ADJ (JJ immobile))))) (PUNCT .))"
+        wim      = WIMAnalyzer(lexicon=VerbLexicon(index)).analyze(parse).serialize()
+        self.assertEqual(wim['rendered-1']['THEME'], 'immobile-1')
+        self.assertEqual(wim['rendered-1']['BENEFICIARY'], 'her-1')
+
+    def test_trie_pruning(self):
+        wanted   = [self.templates["Somebody ----s something"][0]]
+        sentence = BasePhrase("(S (CL (NP (N (NNP John))) (VP (V (VBD hit)) (NP (DET the) (N (NN ball))))) (PUNCT .))")
+        vp       = list(sentence.findall('VP'))[0]
+        bindings = self.templates.trie.bindings(vp.findparent('CL'), wanted)
+        self.assertEqual(bindings.keys(), wanted)
+        self.assertEqual(len(bindings[wanted[0]]), 3)
+
+    def test_trie_memo(self):
+        sentence = BasePhrase("(S (CL (NP (N (NNP John))) (VP (V (VBD hit)) (NP (DET the) (N (NN ball))))) (PUNCT .))")
+        clause   = list(sentence.findall('VP'))[0].findparent('CL')
+        memo     = {}
+        first    = self.templates.trie.bindings(clause, memo=memo)
+        size     = len(memo)
+        second   = self.templates.trie.bindings(clause, memo=memo)
+
+        self.assertEqual(len(memo), size)
+        for template, bindings in first.items():
+            self.assertTrue(second[template] is bindings)
+
+    def test_identical_phrases(self):
+        # Equal but distinct phrases are separate constituents
+        template = self.templates["Somebody ----s something"][0]
+        sentence = BasePhrase("(S (CL (NP (N (NN dog))) (VP (V (VBD saw)) (NP (N (NN dog))))) (PUNCT .))")
+        vp       = list(sentence.findall('VP'))[0]
+        self.assertEqual(len(vp.constituents(template.verbmap)), 3)
+        self.assertEqual(len(self.templates.trie.bindings(vp.findparent('CL'))[template]), 3)
+
+    def test_compiled_predicates(self):
+        predicates = compile_predicates("NP", 'subject,somebody')
+        self.assertEqual([p.function for p in predicates], [NounPhrase.subject.im_func, NounPhrase.somebody.im_func])
+        self.assertEqual([p.cost for p in predicates], [MEDIUM, EXPENSIVE])
+        self.assertEqual(compile_predicates("VP", 'head'), ())
+
+        predicate, = compile_predicates("PREP", 'token:"on"')
+        self.assertEqual(predicate, ('token', CHEAP, TokenPhrase.token.im_func, ('"on"',)))
+
+        # Identical annotations share their compiled predicates
+        self.assertTrue(compile_predicates("NP", 'subject,somebody') is predicates)
+
+        # Token phrases have no somebody method, which raises as it did
+        predicate, = compile_predicates("N", 'somebody')
+        token = BasePhrase("(S (N (NN dog)))")[0]
+        self.assertRaises(AttributeError, predicate.function, token, None)
+
+        # The fast profile substitutes the heuristic for the WordNet check
+        predicates = compile_predicates("NP", 'subject,somebody', FAST)
+        self.assertEqual([p.name for p in predicates], ['subject', 'somebody'])
+        self.assertEqual([p.function for p in predicates], [NounPhrase.subject.im_func, NounPhrase.tagsomebody.im_func])
+        self.assertEqual([p.cost for p in predicates], [MEDIUM, CHEAP])
+        self.assertTrue(VerbTemplate.knowledge.profile(FAST) is VerbTemplate.knowledge.profile(FAST))
+
+    def test_predicate_order(self):
+        # The cheap token check rejects the template before WordNet is used
+        template = self.templates["Somebody ----s on something"][0]
+        sentence = BasePhrase("(S (CL (NP (N (NN dog))) (VP (V (VBD sat)) (PP (PREP (IN in)) (NP (N (NN mud)))))) (PUNCT .))")
+        vp       = list(sentence.findall('VP'))[0]
+        bindings = self.templates.trie.bindings(vp.findparent('CL'), [template])
+        stats    = {}
+
+        self.assertEqual(template.check(vp, bindings[template], stats), None)
+        self.assertEqual(stats.keys(), ['token'])
+        self.assertEqual(stats['token'][0], 1)
+
+    def test_pure_match(self):
+        parse    = "(S (CL (NP (N (NNP John))) (VP (V (VBD hit)) (NP (DET the) (N (NN ball))))) (PUNCT .))"
+        sentence = BasePhrase(parse)
+        vp       = list(sentence.findall('VP'))[0]
+        before   = [(phrase.__dict__.copy()) for phrase in sentence.subtrees()]
+        matches  = self.templates.match(vp)
+
+        frames = [match.template.frame for match in matches]
+        self.assertIn("Somebody ----s something", frames)
+        self.assertEqual(str(sentence), str(BasePhrase(parse)))
+        self.assertEqual([(phrase.__dict__) for phrase in sentence.subtrees()], before)
+
+        match = matches[frames.index("Somebody ----s something")]
+        self.assertEqual([role for role, phrase in match.roles], list(match.template.wimtemplate))
+        self.assertTrue(match.roles[0][1] is vp.subject())
+        self.assertRaises(AttributeError, setattr, match, 'constituents', ())
+
+    def test_requirements(self):
+        template = self.templates["Somebody ----s on something"][0]
+        self.assertTrue(template.requirements.filters)
+
+        sentence = BasePhrase("(S (CL (NP (N (NN dog))) (VP (V (VBD sat)) (PP (PREP (IN in)) (NP (N (NN mud)))))) (PUNCT .))")
+        clause   = list(sentence.findall('VP'))[0].findparent('CL')
+        self.assertFalse(template.requirements.admits(self.templates.fingerprint(clause)))
+
+        sentence = BasePhrase("(S (CL (NP (N (NN dog))) (VP (V (VBD sat)) (PP (PREP (IN on)) (NP (N (NN mud)))))) (PUNCT .))")
+        clause   = list(sentence.findall('VP'))[0].findparent('CL')
+        self.assertTrue(template.requirements.admits(self.templates.fingerprint(clause)))
+
+    def test_requirements_sound(self):
+        # Templates are only ever rejected if they could not have matched
+        rejected = 0
+        for mappings in VerbTemplate.knowledge.values():
+            if mappings[0].get('parse') is None: continue
+            sentence = BasePhrase(str(mappings[0]['parse']))
+
+            for vp in sentence.findall('VP'):
+                clause   = vp.findparent('CL')
+                admitted = self.templates.admissible(clause, self.templates.itertemplates())
+                for template in self.templates.itertemplates():
+                    if template not in admitted:
+                        rejected += 1
+                        self.assertFalse(isinstance(attempt(template.match, vp), TemplateMatch))
+        self.assertGreater(rejected, 0)
+
+class TestCompiledKnowledge(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path   = os.path.join(self.tmpdir, 'verbframes.wimkb')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_lazy(self):
+        class Holder(object):
+            knowledge = LazyKnowledge(self.path)
+
+        self.assertRaises(IOError, getattr, Holder, 'knowledge')
+        VerbTemplate.knowledge.save(self.path)
+        self.assertTrue(Holder.knowledge is Holder.knowledge)
+        self.assertEqual(Holder.knowledge.version, VerbTemplate.knowledge.version)
+
+    def test_save(self):
+        knowledge = VerbTemplate.knowledge
+        knowledge.save(self.path, (ACCURATE, FAST))
+        compiled  = Knowledge.read(self.path)
+
+        self.assertEqual(compiled.version, knowledge.version)
+        self.assertEqual(sorted(compiled.frames()), sorted(knowledge.frames()))
+        self.assertTrue(all(mapping.get('parse') is None for mappings in compiled.values() for mapping in mappings))
+
+        # Predicates load as the ones compiled in this process
+        template = compiled.templates["Somebody ----s something"][0]
+        original = knowledge.templates["Somebody ----s something"][0]
+        self.assertEqual(template.pattern, original.pattern)
+        self.assertEqual(template.requirements.mask, original.requirements.mask)
+        self.assertTrue(template.pattern[2][0][1] is compile_predicates("NP", "subject,somebody"))
+        self.assertEqual(compiled.profile(FAST)["Somebody ----s something"][0].pattern,
+                         knowledge.profile(FAST)["Somebody ----s something"][0].pattern)
+
+        analyzer = WIMAnalyzer(lexicon=VerbLexicon(compiled.templates))
+        for mappings in knowledge.values():
+            parse = mappings[0].get('parse')
+            if parse is None: continue
+            self.assertEqual(analyzer.analyze(str(parse)).serialize(),
+                             WIMAnalyzer(str(parse)).analyze().serialize())
+
+        knowledge.save(self.path, parses=True)
+        compiled = Knowledge.read(self.path)
+        for frame in knowledge:
+            self.assertEqual([mapping.get('parse') for mapping in compiled[frame]],
+                             [mapping.get('parse') for mapping in knowledge[frame]])
+
+    def test_untrusted(self):
+        # Compiled knowledge may not refer to anything but its own types
+        with open(self.path, 'wb') as kbfile:
+            kbfile.write("#wimkb 1\ncos\nsystem\n(S'echo unsafe'\ntR.")
+        self.assertRaises(ValueError, Knowledge.read, self.path)
@@ -0,0 +1,59 @@
+import sys
+sys.path.append("../")
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from wim.lexicon import VerbLexicon
+from wim.utils.containers import LRUCache
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache['a']
+        cache['c'] = 3
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_counters(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache.get('a')
+        cache.get('b')
+
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hit_rate, 0.5)
+
+class TestVerbLexicon(unittest.TestCase):
+
+    def test_resolve(self):
+        lexicon = VerbLexicon(capacity=10)
+        senses  = lexicon.resolve("took")
+
+        self.assertTrue(len(senses) > 0)
+        self.assertEqual(senses, lexicon.resolve("Took"))
+        self.assertEqual(lexicon.misses, 1)
+        self.assertEqual(lexicon.hits, 1)
+
+    def test_persistence(self):
+        tmpdir = tempfile.mkdtemp()
+        path   = os.path.join(tmpdir, 'lexicon.json')
+
+        try:
+            lexicon = VerbLexicon(path=path)
+            senses  = lexicon.resolve("said")
+            lexicon.save()
+
+            reloaded = VerbLexicon(path=path)
+            self.assertEqual(reloaded.resolve("said"), senses)
+            self.assertEqual(reloaded.hits, 1)
+        finally:
+            shutil.rmtree(tmpdir)
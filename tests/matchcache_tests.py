@@ -0,0 +1,75 @@
+import sys
+sys.path.append("../")
+
+import unittest
+
+from wim.frame import VerbTemplate
+from wim.phrase import BasePhrase
+from wim.analyze import WIMAnalyzer
+from wim.matchcache import MatchCache, MISSING
+
+from corpus import example_parses
+
+class TestMatchCache(unittest.TestCase):
+
+    def setUp(self):
+        self.parses = example_parses()
+
+    def test_identical_results(self):
+        expected = [WIMAnalyzer(parse).analyze().serialize() for parse in self.parses]
+        analyzer = WIMAnalyzer(matchcache=True)
+        results  = [wim.serialize() for wim in analyzer.analyze_many(self.parses * 2)]
+
+        self.assertEqual(results, expected * 2)
+        self.assertGreaterEqual(analyzer.matchcache.hits, len(self.parses))
+
+    def test_same_shape(self):
+        cache  = MatchCache(VerbTemplate.knowledge.templates)
+        first  = BasePhrase("(S (CL (NP (N (NNP John))) (VP (V (VBD hit)) (NP (DET the) (N (NN ball))))) (PUNCT .))")
+        second = BasePhrase("(S (CL (NP (N (NNP Mary))) (VP (V (VBD hit)) (NP (DET a) (N (NN wall))))) (PUNCT .))")
+        other  = BasePhrase("(S (CL (NP (N (NNP Mary))) (VP (V (VBD hit)) (NP (DET a) (N (NN dog))))) (PUNCT .))")
+
+        keys = []
+        for sentence in (first, second, other):
+            vp = list(sentence.findall('VP'))[0]
+            keys.append(cache.key(vp, vp.findparent('CL')))
+
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[1], keys[2])   # A dog is somebody
+
+    def test_classified(self):
+        analyzer = WIMAnalyzer()
+        cache    = MatchCache(VerbTemplate.knowledge.templates)
+        first    = BasePhrase("(S (CL (NP (N (NNP John))) (VP (V (VBD hit)) (NP (DET the) (N (NN ball))) "
+                              "(PP (PREP (IN in)) (NP (DET the) (N (NN town)))))) (PUNCT .))")
+        second   = BasePhrase("(S (CL (NP (N (NNP John))) (VP (V (VBD hit)) (NP (DET the) (N (NN ball))) "
+                              "(PP (PREP (IN in)) (NP (DET the) (N (NN dog)))))) (PUNCT .))")
+
+        keys = []
+        for sentence in (first, second):
+            vp     = list(sentence.findall('VP'))[0]
+            clause = vp.findparent('CL')
+            nps    = cache.classified(clause, analyzer.candidates(vp))
+            self.assertIn(id(vp.subject()), nps)
+            keys.append(cache.key(vp, clause, analyzer.candidates(vp)))
+
+        # No candidate checks whether the object of the preposition is somebody
+        self.assertEqual(keys[0], keys[1])
+
+    def test_rebind(self):
+        analyzer = WIMAnalyzer()
+        cache    = MatchCache(VerbTemplate.knowledge.templates)
+        first    = BasePhrase("(S (CL (NP (N (NNP John))) (VP (V (VBD hit)) (NP (DET the) (N (NN ball))))) (PUNCT .))")
+        second   = BasePhrase("(S (CL (NP (N (NNP Mary))) (VP (V (VBD hit)) (NP (DET a) (N (NN wall))))) (PUNCT .))")
+
+        vp     = list(first.findall('VP'))[0]
+        clause = vp.findparent('CL')
+        key    = cache.key(vp, clause)
+        self.assertTrue(cache.get(key, clause) is MISSING)
+        cache.put(key, clause, analyzer.choose(vp))
+
+        vp     = list(second.findall('VP'))[0]
+        clause = vp.findparent('CL')
+        match  = cache.get(cache.key(vp, clause), clause)
+        self.assertEqual(match, analyzer.choose(vp))
+        self.assertTrue(match.constituents[0] is vp.subject())
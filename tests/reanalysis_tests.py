@@ -0,0 +1,69 @@
+import sys
+sys.path.append("../")
+
+import unittest
+
+from wim.frame import Knowledge, VerbTemplate
+from wim.lexicon import VerbLexicon
+from wim.analyze import WIMAnalyzer, analyze_stream
+from wim.reanalysis import reanalyze, stale
+
+from corpus import example_parses
+
+class TestReanalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.parses = example_parses()
+
+        # The knowledge with the roles of a single frame edited
+        self.frame = "Somebody ----s something"
+        mappings   = dict((key, list(values)) for key, values in VerbTemplate.knowledge.items())
+        mapping    = dict(mappings[self.frame][0])
+        mapping['wimtemplate'] = "EXPERIENCER HEAD THEME"
+        mappings[self.frame] = [mapping]
+        self.knowledge = Knowledge(**mappings)
+
+    def test_provenance(self):
+        analyzer = WIMAnalyzer()
+        tree     = analyzer.phrase(self.parses[0])
+        wim      = analyzer.analyze(tree)
+        self.assertEqual(wim.provenance['signature'], analyzer.signature)
+        self.assertEqual(len(wim.provenance['phrases']), len(list(analyzer.rootVPs(tree))))
+        for record in wim.provenance['phrases']:
+            self.assertIn(record['chosen'], record['tried'] + [None])
+            for digest in record['tried']:
+                self.assertIn(digest, record['candidates'])
+
+    def test_diff(self):
+        diff = VerbTemplate.knowledge.diff(self.knowledge)
+        self.assertEqual(diff, {'added': set(), 'removed': set(), 'changed': set([self.frame])})
+        self.assertNotEqual(VerbTemplate.knowledge.version, self.knowledge.version)
+
+    def test_reanalyze(self):
+        records  = list(analyze_stream(self.parses, WIMAnalyzer(), provenance=True))
+        analyzer = WIMAnalyzer(lexicon=VerbLexicon(self.knowledge.compile()))
+        expected = list(analyze_stream(self.parses, analyzer, provenance=True))
+
+        updated  = list(reanalyze(self.parses, records, analyzer, VerbTemplate.knowledge.diff(self.knowledge)))
+        redone   = sum(1 for record, reanalyzed in updated if reanalyzed)
+        self.assertGreater(redone, 0)
+        self.assertLess(redone, len(self.parses))
+        self.assertEqual([record['wim'] for record, reanalyzed in updated],
+                         [record['wim'] for record in expected])
+
+        # Current records are never reanalyzed
+        for record, reanalyzed in reanalyze(self.parses, expected, analyzer):
+            self.assertFalse(reanalyzed)
+        self.assertTrue(stale(None, analyzer))
+
+    def test_signature(self):
+        records  = list(analyze_stream(self.parses[:5], WIMAnalyzer(relations=["AGENT"]), provenance=True))
+        analyzer = WIMAnalyzer()
+
+        # Records of another configuration are stale even if no frame changed
+        diff = VerbTemplate.knowledge.diff(VerbTemplate.knowledge)
+        for record, reanalyzed in reanalyze(self.parses[:5], records, analyzer, diff):
+            self.assertTrue(reanalyzed)
+            self.assertEqual(record['wim_provenance']['signature'], analyzer.signature)
+        for record in records:
+            self.assertTrue(stale(record['wim_provenance'], analyzer))
@@ -0,0 +1,38 @@
+import sys
+sys.path.append("../")
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from wim.lexicon import VerbLexicon
+from wim.verbtable import VerbTable, build
+
+class TestVerbTable(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(klass):
+        klass.tmpdir = tempfile.mkdtemp()
+        klass.path   = os.path.join(klass.tmpdir, 'verbs.tbl')
+        build(klass.path)
+
+    @classmethod
+    def tearDownClass(klass):
+        shutil.rmtree(klass.tmpdir)
+
+    def test_matches_wordnet(self):
+        table   = VerbTable(self.path)
+        lexicon = VerbLexicon()
+
+        for text in ("is", "said", "took", "takes", "taking", "gave", "falls", "raining", "befooled"):
+            self.assertEqual(table.lookup(text), lexicon.lookup(text))
+            self.assertEqual(table.base_forms(text), lexicon.base_forms(text))
+
+        for text in ("Running", "THIN", "Took"):
+            self.assertEqual(table.lookup(text), lexicon.lookup(text))
+
+    def test_unknown(self):
+        table = VerbTable(self.path)
+        self.assertEqual(table.resolve("xyzzy"), ())
+        self.assertEqual(table.morphy("xyzzy"), [])
@@ -0,0 +1,67 @@
+import sys
+sys.path.append("../")
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from nltk.tree import Tree
+from wim.analyze import WIMAnalyzer
+from wim.wimcache import WIMCache
+
+from corpus import example_parses
+
+class TestWIMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path   = os.path.join(self.tmpdir, 'wims.db')
+        self.parses = example_parses()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_identical_results(self):
+        expected = [WIMAnalyzer(parse).analyze().serialize() for parse in self.parses]
+        for run in xrange(2):
+            analyzer = WIMAnalyzer(wimcache=self.path)
+            results  = [wim.serialize() for wim in analyzer.analyze_many(self.parses)]
+            self.assertEqual(results, expected)
+        self.assertEqual(analyzer.wimcache.hits, len(self.parses))
+
+    def test_keys(self):
+        cache = WIMCache(self.path)
+        parse = self.parses[0]
+        key   = cache.key(parse)
+
+        # The key is of the canonical tree, however it is written
+        self.assertEqual(cache.key(Tree.parse(parse)), key)
+        self.assertEqual(cache.key(parse.replace(" (", "  (")), key)
+        self.assertNotEqual(cache.key(self.parses[1]), key)
+        self.assertNotEqual(cache.key(parse, WIMAnalyzer(relations=["AGENT"]).signature), key)
+
+    def test_eviction(self):
+        cache = WIMCache(self.path, capacity=4096)
+        wim   = WIMAnalyzer().analyze(self.parses[0])
+        for idx in xrange(100):
+            cache.put(str(idx), wim)
+
+        self.assertLessEqual(cache.size(), 4096)
+        self.assertLess(len(cache), 100)
+        self.assertEqual(cache.get("99").serialize(), wim.serialize())
+        self.assertIsNone(cache.get("0"))
+
+    def test_untrusted(self):
+        # Cached WIMs may not refer to anything but the WIM classes
+        cache = WIMCache(self.path)
+        cache.put("wim", WIMAnalyzer().analyze(self.parses[0]))
+        with cache.connection as conn:
+            conn.execute("UPDATE wims SET wim = ? WHERE key = ?", ("cos\nsystem\n(S'echo unsafe'\ntR.", "wim"))
+        self.assertIsNone(cache.get("wim"))
+        self.assertEqual(cache.misses, 1)
+
+    def test_truncated(self):
+        analyzer = WIMAnalyzer(wimcache=self.path, max_trials=0)
+        self.assertTrue(analyzer.analyze(self.parses[0]).truncated)
+        self.assertEqual(len(analyzer.wimcache), 0)
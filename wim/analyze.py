@@ -1,16 +1,208 @@
+import gc
+import os
+import time
+import threading
+
+from itertools import islice
+from collections import OrderedDict
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
+from nltk.tree import Tree
 from nltk.corpus import wordnet as wn
 
 from base import WIM
 from phrase import BasePhrase
-from frame import VerbTemplate
+from frame import TemplateMatch, ACCURATE
+from lexicon import VerbLexicon
+from matchcache import MatchCache, MISSING
+from wimcache import WIMCache
+from utils import memory_usage, WORDNET_LOCK
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+##########################################################################
+## Module Static Variables
+##########################################################################
+
+# Auxiliary and modal verbs, the verb phrases governed by which can be
+# skipped, e.g. "falling" in "the ball is falling".
+AUXILIARIES = frozenset([
+    'be', 'am', 'is', 'are', 'was', 'were', 'been', 'being', "'s", "'re", "'m",
+    'have', 'has', 'had', 'having', "'ve", "'d",
+    'do', 'does', 'did',
+    'will', 'would', 'shall', 'should', 'can', 'could', 'may', 'might', 'must',
+    "'ll", 'ought',
+])
+
+##########################################################################
+## Analyzer
+##########################################################################
 
 class WIMAnalyzer(object):
+    """
+    Analyzes parse trees into WIMs. An analyzer is intended to be long
+    lived: the lexicon and its caches, as well as the compiled templates,
+    are reused by every tree that it analyzes, either one at a time with
+    ``analyze`` or in bulk with ``analyze_many``.
+    """
+
+    @staticmethod
+    def phrase(tree):
+        """
+        Converts a tree string, an ``nltk.tree.Tree`` or a ``BasePhrase``
+        into the ``BasePhrase`` to analyze, or None for an empty tree.
+        """
+        if tree is None or isinstance(tree, BasePhrase):
+            return tree
+        if isinstance(tree, Tree):
+            return BasePhrase.convert(tree)
+        if not tree.strip():
+            return None
+        return BasePhrase(tree)
+
+    def __init__(self, tree=None, lexicon=None, reorder=False, matchcache=None,
+                 consumed=False, auxiliaries=None, lemmas=None, relations=None,
+                 timeout=None, max_trials=None, profile=None, wimcache=None, timing=False):
+        self._tree = self.phrase(tree)
+        self._lock = threading.Lock()
+
+        # The analysis profile, ACCURATE or FAST, is that of the templates
+        # of the lexicon, which trades the WordNet noun classifiers for tag
+        # and word list heuristics in the fast profile.
+        if lexicon is None:
+            lexicon = VerbLexicon.default(profile or ACCURATE)
+        elif profile is not None and lexicon.templates.profile != profile:
+            raise ValueError("The lexicon resolves templates of the %s profile" % lexicon.templates.profile)
+
+        self.lexicon = lexicon
+        self.profile = lexicon.templates.profile
+        self.reorder = reorder
+        self.stats   = AnalysisStats()
+
+        # Pass timing=True to count the calls and time of every verbmap
+        # predicate in the stats, which costs two clock reads per check.
+        self.timing  = timing
+
+        # Skipping policies, which by default analyze every verb phrase:
+        # consumed skips the verb phrases that an earlier match in the same
+        # clause bound as a constituent, and auxiliaries is a set of verbs
+        # (e.g. AUXILIARIES) whose verb phrases analyze for the verb phrases
+        # they govern, which are skipped.
+        self.consumed    = consumed
+        self.auxiliaries = frozenset(auxiliaries or ())
+
+        # Selective analysis, which by default analyzes for everything:
+        # lemmas is a watch-list of the head lemmas to analyze, and
+        # relations the roles (e.g. "AGENT", "THEME") to add to the WIM.
+        # Templates that produce none of the relations are never tried.
+        self.lemmas    = frozenset(lemma.lower() for lemma in lemmas) if lemmas else None
+        self.relations = frozenset(relations) if relations else None
+        self.producing = self.lexicon.templates.producing(relations) if relations else None
+
+        # The default budget of every analysis, which by default is unbounded
+        self.timeout    = timeout
+        self.max_trials = max_trials
 
-    def __init__(self, tree_str):
-        self._tree = BasePhrase(tree_str)
-        #self._tree = BasePhrase.convert(tree)
+        # Pass True for a cache of matches that is shared across sentences
+        if matchcache is True:
+            matchcache = MatchCache(self.lexicon.templates)
+        self.matchcache = matchcache
+
+        # Pass the path of a WIMCache to reuse the WIMs of earlier runs
+        if isinstance(wimcache, basestring):
+            wimcache = WIMCache(wimcache, knowledge=self.lexicon.templates.knowledge)
+        self.wimcache = wimcache
+
+    @property
+    def signature(self):
+        """
+        The configuration of the analyzer that decides the WIMs it
+        analyzes, part of the key of every WIM in its ``wimcache``.
+        """
+        return repr((self.profile, bool(self.consumed), sorted(self.auxiliaries),
+                     sorted(self.lemmas or ()), sorted(self.relations or ())))
+
+    @property
+    def trials(self):
+        return self.stats.trials
+
+    @property
+    def hits(self):
+        return self.stats.hits
+
+    @property
+    def predicates(self):
+        return self.stats.predicates
         
-    def analyze(self):
+    def warm(self, heads=()):
+        """
+        Loads everything that analysis needs up front: the compiled
+        templates, the WordNet indices and classifier synsets used by the
+        noun phrase checks, and the senses of any head texts given.
+        """
+        self.lexicon.templates
+        with WORDNET_LOCK:
+            for classifier in ('animal.n.01', 'body_part.n.01'):
+                wn.synset(classifier)
+        for head in heads:
+            self.lexicon.resolve(head)
+
+    def analyze_many(self, trees):
+        """
+        Analyzes every tree in an iterable of tree strings, Trees or
+        BasePhrases, yielding a WIM for each in input order.
+        """
+        for tree in trees:
+            yield self.analyze(tree)
+
+    def analyze(self, tree=None, timeout=None, max_trials=None):
+        """
+        Analyzes the tree, or the tree the analyzer was constructed with
+        if no tree is passed in, and returns its WIM.
+
+        The analysis can be budgeted by a timeout in seconds and/or a
+        maximum number of template trials, which default to the budget of
+        the analyzer. When the budget runs out, the verb phrases analyzed
+        so far are returned as a WIM flagged as ``truncated``. The ``usage``
+        of a budgeted WIM records the trials and time it took.
+
+        The ``provenance`` of the WIM records the ``signature`` of the
+        analyzer and, for every verb phrase, the templates that were
+        candidates, tried and chosen (see ``provenance``), from which
+        ``wim.reanalysis`` decides whether the WIM is still current for
+        another analyzer or version of the knowledge.
+
+        If the analyzer has a ``wimcache``, the WIM of a tree that has
+        been analyzed before is returned from the cache without being
+        analyzed (or even converted) again, and every WIM that is
+        analyzed in full is added to it.
+
+        All of the state of an analysis is local to the call, so a single
+        analyzer can analyze trees from many threads at once.
+        """
+        key = None
+        if self.wimcache is not None and tree is not None:
+            if not isinstance(tree, basestring) or tree.strip():
+                key = self.wimcache.key(tree, self.signature)
+                wim = self.wimcache.get(key, MISSING)
+                if wim is not MISSING:
+                    return wim
+
+        wim = self.interpret(tree, timeout, max_trials)
+        if key is not None and (wim is None or not wim.truncated):
+            self.wimcache.put(key, wim)
+        return wim
+
+    def interpret(self, tree=None, timeout=None, max_trials=None):
+        """
+        Analyzes the tree as ``analyze`` does, without the ``wimcache``.
+        """
+        budget = Budget(timeout if timeout is not None else self.timeout,
+                        max_trials if max_trials is not None else self.max_trials)
+        tree   = self.phrase(tree) if tree is not None else self._tree
 
         def getframeforwim(framemap, ct, wim):
             if id(ct) not in framemap:
@@ -18,85 +210,491 @@ class WIMAnalyzer(object):
                 framemap[id(ct)].addproperty("fromtext", ct.text())
             return framemap[id(ct)]
 
-        self._wim = WIM()
+        wim      = WIM()
+        memo     = {}               # Verbmap bindings of this tree only
+        stats    = AnalysisStats()
         framemap = {}
 
-        if self._tree is None:
-            return self._wim
+        wim.provenance = {'signature': self.signature, 'phrases': []}
+
+        if tree is None:
+            return budget.close(wim, stats)
         
         # Temporary
         #for np in self.rootNPs():
         #    assert getframeforwim(framemap, np, self._wim)
 
-        for vp in self.rootVPs():
-            assert getframeforwim(framemap, vp, self._wim) #TODO: IS this a bad thing?
-            
-            matches = []
-            for synset in wn.synsets(vp.headtext(), pos=wn.VERB):
-                for lemma in synset.lemmas:
-                    for frame in lemma.frame_strings:   
-                        try:
-                            vframe = VerbTemplate(frame, lemma.name)
-                            vframe._sense = synset.name
-                        except KeyError as e:
-                            # Temporary:
-                            #print str(e)
-                            #print frame
-                            #print lemma.name
-                            #print synset
-                            #print
-                            continue
-                                                  
-                        if (vframe.match(vp)):
-                            matches.append(vframe)
-                            
-            vp._sense = self.disambiguate(vp, matches) 
-
-            if vp._sense is not None:
-                for idx, ct in enumerate(vp._sense.constituents):
-                    try:
-                        # TODO: Move the skip "X" to the WIMFrame object
-                        if vp._sense.wimtemplate[idx] == "X": continue
-                        getframeforwim(framemap, vp, self._wim).addproperty(vp._sense.wimtemplate[idx], getframeforwim(framemap, ct, self._wim))
-                    except IndexError:
-                        #print vp._sense.wimtemplate
-                        #print [c.node for c in vp._sense.constituents]
-                        #print self._tree.text()
-                        return
+        consumed = set()            # Phrases bound by the matches so far
+
+        try:
+            for vp in self.rootVPs(tree):
+                assert getframeforwim(framemap, vp, wim) #TODO: IS this a bad thing?
+
+                if self.skip(vp, consumed):
+                    stats.skipped += 1
+                    wim.provenance['phrases'].append({'head': vp.headtext(), 'skipped': True})
+                    continue
+
+                budget.check(stats)
+                candidates = self.candidates(vp)
+                tried      = []
+                match      = self.choose(vp, memo, stats, budget, tried, candidates)
+                wim.provenance['phrases'].append(self.provenance(vp, candidates, tried, match))
+                if match is None: continue
+
+                clause = vp.findparent('CL')
+                consumed.update(id(ct) for ct in match.constituents
+                                if ct is not vp and ct.findparent('CL') is clause)
+
+                for role, ct in match.roles:
+                    # TODO: Move the skip "X" to the WIMFrame object
+                    if role == "X": continue
+                    if self.relations is not None and role not in self.relations: continue
+                    getframeforwim(framemap, vp, wim).addproperty(role, getframeforwim(framemap, ct, wim))
+
+                # Constituents without a role in the wimtemplate
+                if len(match.constituents) > len(match.template.wimtemplate):
+                    return
+        except BudgetExhausted:
+            wim.truncated = True
+        finally:
+            with self._lock:
+                self.stats.update(stats)
         
-        return self._wim
+        return budget.close(wim, stats)
         
-    def disambiguate(self, vp, matches):
+    def skip(self, vp, consumed=()):
+        """
+        Returns True if the skipping policies of the analyzer say the verb
+        phrase needn't be matched: because a match of an earlier verb phrase
+        in the same clause bound it as a constituent (the ids of those
+        phrases are passed in consumed), or because it is governed by an
+        auxiliary or modal verb phrase, e.g. "falling" in "is falling" or
+        "sing" in "can sing". The governing verb phrase comes first and
+        already matches the verb chain, either through the templates of
+        the auxiliary ("Something is ----ing PP") or because the head of
+        a modal verb phrase is the verb that it governs. Verb phrases whose
+        head cannot be a lemma on the watch-list are skipped before their
+        senses are looked up. Skipped verb phrases still have a frame in the
+        WIM, but no properties of their own.
+        """
+        if self.lemmas is not None and self.lemmas.isdisjoint(self.lexicon.base_forms(vp.headtext())):
+            return True
+        if self.consumed and id(vp) in consumed:
+            return True
+        if self.auxiliaries:
+            parent = vp._parent
+            if parent is not None and parent.node == "VP":
+                verb = parent.find("MD") or parent.find("V")
+                return verb is not None and verb.text().lower() in self.auxiliaries
+        return False
+
+    def choose(self, vp, memo=None, stats=None, budget=None, trace=None, candidates=None):
+        """
+        Returns the ``TemplateMatch`` chosen for the verb phrase by
+        ``evaluate``, replayed from the match cache if the analyzer has one
+        and the shape of the clause has been seen before.
+
+        :param candidates: The ``candidates`` of the verb phrase, if the
+            caller has already resolved them.
         """
-        Take the first longest match template
+        candidates = candidates if candidates is not None else self.candidates(vp)
+        if self.matchcache is None:
+            return self.evaluate(vp, candidates, memo, stats, budget, trace)
+
+        clause = vp.findparent('CL')
+        key    = self.matchcache.key(vp, clause, candidates, memo)
+        match  = self.matchcache.get(key, clause)
+        if match is MISSING:
+            match = self.evaluate(vp, candidates, memo, stats, budget, trace)
+            self.matchcache.put(key, clause, match)
+        return match
+
+    @staticmethod
+    def provenance(vp, candidates, tried=(), match=None):
         """
-        temsize = 0
-        longest = None
+        The record of how a template was chosen for the verb phrase: its
+        ``head`` text and the digests (``VerbTemplate.digest``) of its
+        ``candidates`` in order, of the templates ``tried`` (none if the
+        choice was replayed from the match cache) and of the template
+        ``chosen``, or None.
+        """
+        return {
+            'head': vp.headtext(),
+            'candidates': [template.digest for template in candidates],
+            'tried': [template.digest for template in tried],
+            'chosen': match.template.digest if match is not None else None,
+        }
 
-        for match in matches:
-            if (len(match.wimtemplate) > temsize or 
-                (len(match.wimtemplate) == temsize and 'SCOPE' in longest.wimtemplate and 'SCOPE' not in match.wimtemplate)):
-                temsize = len(match.wimtemplate)
-                longest = match
-        return longest
+    def candidates(self, vp):
+        """
+        Collapses the templates proposed by every sense of the head of the
+        verb phrase into the unique candidate templates, mapped to the
+        synsets that proposed them. Templates are ordered by their first
+        proposal, which is the candidate order that ``evaluate`` breaks
+        ties in rank by, and synsets by the order in which they proposed
+        it, which become the ``senses`` of a match of the template.
 
-    def rootNPs(self):
+        :param vp: The verb phrase, or the head text of a verb phrase
+        :returns: The candidate templates and the synsets proposing them
+        :rtype: ``OrderedDict``
+        """
+        head       = vp if isinstance(vp, basestring) else vp.headtext()
+        candidates = OrderedDict()
+        for sense in self.lexicon.resolve(head):
+            for template in sense.templates:
+                if self.producing is not None and template not in self.producing:
+                    continue
+                candidates.setdefault(template, []).append(sense.synset)
+        return candidates
+
+    @staticmethod
+    def rank(template):
+        """
+        The sort key that orders templates as ``evaluate`` prefers them:
+        longest wimtemplate first, then templates without SCOPE.
+        """
+        return (-len(template.wimtemplate), 'SCOPE' in template.wimtemplate)
+
+    def evaluate(self, vp, candidates, memo=None, stats=None, budget=None, trace=None):
+        """
+        Rejects the candidate templates whose requirements the clause of
+        the verb phrase does not meet, finds the bindings of the rest in
+        the clause with a single walk of the template trie, then checks
+        them against the verb phrase in ``rank`` order and returns the
+        ``TemplateMatch`` of the first longest template to match (with
+        every synset that proposed it as its senses), or None if no
+        template matches. Because the first template to match in rank order can't be
+        beaten by any template ranked after it, evaluation stops there.
+
+        Templates that tie in rank are chosen between by candidate order,
+        so if the analyzer reorders by hit rate, a match within a tie only
+        bounds the search to the untried templates of that tie that come
+        earlier in candidate order.
+
+        :param candidates: The ``OrderedDict`` returned by ``candidates``
+        :param memo: The verbmap bindings memo of the tree being analyzed
+        :param stats: The ``AnalysisStats`` to count the trials in,
+            defaults to the statistics of the analyzer.
+        :param budget: The ``Budget`` checked before every trial, which
+            raises ``BudgetExhausted`` once it runs out.
+        :param trace: A list to append every template tried to.
+        :rtype: ``TemplateMatch``
+        """
+        stats    = stats if stats is not None else self.stats
+        index    = self.lexicon.templates
+        clause   = vp.findparent('CL')
+        admitted = index.admissible(clause, candidates, memo)
+        bindings = index.trie.bindings(clause, admitted, memo)
+
+        stats.rejected += len(candidates) - len(admitted)
+
+        groups = OrderedDict()
+        ranked = sorted(enumerate(candidates), key=lambda (idx, template): self.rank(template))
+        for idx, template in ranked:
+            if template in bindings:
+                groups.setdefault(self.rank(template), []).append((idx, template))
+
+        for group in groups.values():
+            if self.reorder:
+                group.sort(key=lambda (idx, template): -self.hitrate(template))
+
+            best = None
+            for idx, template in group:
+                if best is not None and idx > best[0]: continue
+                if budget is not None: budget.check(stats)
+                if trace is not None: trace.append(template)
+                constituents = self.trial(template, vp, bindings[template], stats)
+                if constituents is not None:
+                    best = (idx, template, constituents)
+
+            if best is not None:
+                idx, template, constituents = best
+                return TemplateMatch(template, tuple(candidates[template]), constituents)
+        return None
+
+    def trial(self, template, vp, bindings, stats):
+        """
+        Checks the bindings of a template in the clause of the verb phrase,
+        keeping count of the attempts and the hits of each template.
+        """
+        stats.trials += 1
+        constituents = template.check(vp, bindings, stats.predicates if self.timing else None)
+
+        counts = stats.hits.setdefault(template, [0, 0])
+        counts[0] += 1
+        if constituents is not None:
+            counts[1] += 1
+        return constituents
+
+    def hitrate(self, template):
+        """
+        The fraction of attempts at which the template has matched.
+        """
+        attempts, matches = self.stats.hits.get(template, (0, 0))
+        if not attempts: return 0.0
+        return float(matches) / attempts
+
+    def rootNPs(self, tree=None):
         """
         @todo: Need another BasePhrase traversal helper method to get
             lowest node that matches a given part of speech.
         """
-        for phrase in self._tree.findall("NP"):
+        tree = tree if tree is not None else self._tree
+        for phrase in tree.findall("NP"):
             if len(list(phrase.findall("NP"))) == 1:
                 yield phrase
 
-    def rootVPs(self):
+    def rootVPs(self, tree=None):
         """
         @todo: Do a contains method on the phrase for traversal
         """
-        for phrase in self._tree.findall("VP"):
+        tree = tree if tree is not None else self._tree
+        for phrase in tree.findall("VP"):
             #if len(list(phrase.findall("VP"))) == 1:
             yield phrase
         
+class AnalysisStats(object):
+    """
+    Counts the work done by analyses: the number of template trials, of
+    candidates rejected without a trial and of verb phrases skipped, the
+    attempts and matches of each template and, if the analyzer is timing
+    them, the calls and time spent in each verbmap predicate. Every
+    analysis counts into its own statistics, which are then added to the
+    statistics of the analyzer with update.
+    """
+
+    def __init__(self):
+        self.trials     = 0         # Number of template matches attempted
+        self.rejected   = 0         # Candidates rejected by requirements
+        self.skipped    = 0         # Verb phrases skipped by the policies
+        self.hits       = {}        # Template -> [attempts, matches]
+        self.predicates = {}        # Predicate name -> [calls, seconds]
+
+    def update(self, other):
+        self.trials += other.trials
+        self.rejected += other.rejected
+        self.skipped += other.skipped
+        for counts, others in ((self.hits, other.hits), (self.predicates, other.predicates)):
+            for key, values in others.items():
+                totals = counts.setdefault(key, [0] * len(values))
+                for idx, value in enumerate(values):
+                    totals[idx] += value
+
+##########################################################################
+## Analysis Budgets
+##########################################################################
+
+class BudgetExhausted(Exception):
+    """
+    Raised by ``Budget.check`` to abandon an analysis that ran out of budget.
+    """
+    pass
+
+class Budget(object):
+    """
+    The budget of a single analysis: a timeout in seconds from its start
+    and a maximum number of template trials, either of which may be None
+    for no limit. Checking the budget before every verb phrase and trial
+    bounds an analysis to about one trial past its budget.
+    """
+
+    def __init__(self, timeout=None, max_trials=None):
+        self.timeout    = timeout
+        self.max_trials = max_trials
+        self.start      = time.time()
+        self.deadline   = self.start + timeout if timeout is not None else None
+
+    @property
+    def unbounded(self):
+        return self.timeout is None and self.max_trials is None
+
+    def check(self, stats):
+        """
+        Raises ``BudgetExhausted`` if the trials counted in stats have used
+        up the budget or the deadline has passed.
+        """
+        if self.max_trials is not None and stats.trials >= self.max_trials:
+            raise BudgetExhausted("Exhausted the budget of %i trials" % self.max_trials)
+        if self.deadline is not None and time.time() > self.deadline:
+            raise BudgetExhausted("Exhausted the budget of %0.3f seconds" % self.timeout)
+
+    def close(self, wim, stats):
+        """
+        Records the usage of the budget on the WIM of the analysis.
+        """
+        if wim is not None and not self.unbounded:
+            wim.usage = {
+                'truncated': wim.truncated,
+                'trials': stats.trials,
+                'max_trials': self.max_trials,
+                'elapsed': time.time() - self.start,
+                'timeout': self.timeout,
+            }
+        return wim
+
+##########################################################################
+## Streaming Analysis
+##########################################################################
+
+def analyze_stream(lines, analyzer=None, index=1, provenance=False):
+    """
+    Analyzes a stream of flattened parses, one per line as written by
+    ``flatten_tree_string``, yielding for each line a record with the same
+    keys as the output of ``bin/wimify.py``: the ``index`` of the line
+    (counting from index), its serialized ``wim`` and the ``wim_time``,
+    and if the analyzer is budgeted, the ``wim_budget`` usage (including
+    whether the WIM was ``truncated``). If provenance is True, records also
+    hold the ``wim_provenance`` of their WIM for ``wim.reanalysis``.
+
+    Lines are read and records yielded one at a time with a single long
+    lived analyzer, so memory stays bounded by the analyzer's caches no
+    matter how long the stream is. Blank lines yield an empty WIM so that
+    the records stay aligned with the input lines.
+
+    :param lines: An iterable of parse strings, e.g. an open file.
+    :param analyzer: The analyzer to use, defaults to a new ``WIMAnalyzer``.
+    :param index: The index of the first line.
+    :param provenance: Whether to add the provenance of the WIMs.
+    """
+    analyzer = analyzer or WIMAnalyzer()
+    for index, line in enumerate(lines, index):
+        line = line.strip()
+        if not line:
+            record = {'index': index, 'wim': {}, 'wim_time': 0.0}
+            if provenance:
+                record['wim_provenance'] = {'signature': analyzer.signature, 'phrases': []}
+            yield record
+            continue
+
+        start = time.time()
+        wim   = analyzer.analyze(line)
+        delta = time.time() - start
+
+        record = {
+            'index': index,
+            'wim': wim.serialize() if wim is not None else {},
+            'wim_time': delta,
+        }
+        if wim is not None and wim.usage is not None:
+            record['wim_budget'] = wim.usage
+        if provenance:
+            record['wim_provenance'] = wim.provenance if wim is not None else None
+        yield record
+
+##########################################################################
+## Parallel Analysis
+##########################################################################
+
+# The analyzer of a worker process, set in each worker by _initialize from
+# the analyzer it was forked with; the parent never sets it.
+_worker = None
+
+def _initialize(analyzer, memory):
+    global _worker
+    _worker = (analyzer, memory)
+
+    # Forked workers inherit the parent's open WordNet data files, and with
+    # them a shared file offset, which no lock can guard since each process
+    # buffers its reads of the file on its own. So every worker must open
+    # its own files; WORDNET_LOCK only guards the threads of a process.
+    for datafile in wn._data_file_map.values():
+        datafile.close()
+    wn._data_file_map.clear()
+
+def _analyze(trees):
+    analyzer, memory = _worker
+
+    wims = []
+    for tree in trees:
+        wim = analyzer.analyze(tree)
+        wims.append(wim.serialize() if wim is not None else None)
+    return os.getpid(), memory_usage() if memory else None, wims
+
+def _chunks(trees, size):
+    trees = iter(trees)
+    while True:
+        chunk = list(islice(trees, size))
+        if not chunk:
+            return
+        yield chunk
+
+def analyze_parallel(trees, workers=None, chunksize=16, lexicon=None, heads=(), memory=None):
+    """
+    Analyzes tree strings with a pool of worker processes, yielding the
+    serialized WIM of each tree in input order.
+
+    The analyzer is built and warmed in the parent and handed to the
+    workers as they are forked, so the knowledge, compiled templates,
+    WordNet indices and lexicon caches are shared with every worker
+    copy-on-write rather than loaded once per worker. Only the WordNet
+    data files are opened again by every worker.
+
+    :param workers: The number of worker processes, defaults to the cpus.
+    :param chunksize: The number of trees sent to a worker at a time.
+    :param lexicon: The lexicon to analyze with, defaults to the shared one.
+    :param heads: Head texts to resolve in the parent before forking.
+    :param memory: If a dict is given, it is filled with the resident,
+        shared and private memory (kB) of each worker that analyzed trees,
+        keyed by pid, as sampled after the last chunk it analyzed.
+    """
+    analyzer = WIMAnalyzer(lexicon=lexicon)
+    analyzer.warm(heads)
+
+    # Collect before forking so the workers do not copy pages of garbage,
+    # and the surviving objects sit in the oldest generation.
+    gc.collect()
+
+    workers = workers or cpu_count()
+    pool    = Pool(workers, _initialize, (analyzer, memory is not None))
+    try:
+        trees = (tree if isinstance(tree, basestring) else str(tree) for tree in trees)
+        for pid, usage, wims in pool.imap(_analyze, _chunks(trees, chunksize)):
+            if usage is not None:
+                memory[pid] = usage
+            for wim in wims:
+                yield wim
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+##########################################################################
+## Threaded Analysis
+##########################################################################
+
+def analyze_threaded(trees, workers=None, analyzer=None):
+    """
+    Analyzes trees with a pool of threads that share a single analyzer,
+    yielding the WIM of each tree in input order. There is nothing to
+    fork or pickle, so threads scale across cores on interpreters without
+    a global lock, and elsewhere still overlap WordNet file I/O with the
+    matching of other trees.
+
+    Uses a ``concurrent.futures.ThreadPoolExecutor`` if it is available,
+    or else a ``multiprocessing.pool.ThreadPool``.
+
+    :param workers: The number of threads, defaults to the number of cpus.
+    :param analyzer: The ``WIMAnalyzer`` to share, defaults to a new one.
+    """
+    analyzer = analyzer or WIMAnalyzer()
+    analyzer.warm()
+    workers  = workers or cpu_count()
+
+    if ThreadPoolExecutor is not None:
+        with ThreadPoolExecutor(workers) as executor:
+            for wim in executor.map(analyzer.analyze, trees):
+                yield wim
+    else:
+        pool = ThreadPool(workers)
+        try:
+            for wim in pool.imap(analyzer.analyze, trees):
+                yield wim
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
 if __name__ == '__main__':
 
     #analyzer = WIMAnalyzer("(S (S (CL (NP (DET (DT the)) (NP (N man)))(VP (V hit)(NP (DET (DT the)) (NP (N building))))))(PUNCT .))")
@@ -41,15 +41,36 @@ class WIM(object):
         __dict__ attribute for property access. The key of this dictionary
         is the frame type, and the value is a list of objects that match
         that frame type.
+
+    ..  attribute:: truncated
+        True if the analysis that built the WIM ran out of its budget, in
+        which case the WIM holds only the frames analyzed before it did.
+
+    ..  attribute:: usage
+        The budget usage of the analysis that built the WIM, a dictionary
+        suitable for JSON output, or None if the analysis was unbudgeted.
+
+    ..  attribute:: provenance
+        The signature of the analyzer that built the WIM and the list of
+        records of how each verb phrase was analyzed, suitable for JSON
+        output, or None if the WIM was not built by an analyzer.
     """
 
-    def __init__(self, frames={}):
+    # Defaults for WIMs pickled before these attributes were added
+    truncated  = False
+    usage      = None
+    provenance = None
+
+    def __init__(self, frames=None):
         """
         Build a WIM object.
 
         :param frames: An optional frame dictionary to initialize with.
         """
-        self._frames = frames
+        self._frames = frames if frames is not None else {}
+        self.truncated = False
+        self.usage = None
+        self.provenance = None
         
     def addframe(self, ftype):
         """
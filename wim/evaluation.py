@@ -0,0 +1,112 @@
+# wim.evaluation
+# Wim: Analysis Profile Evaluation
+#
+# Author:  Jesse English <jesse@unboundconcepts.com>
+#          Benjamin Bengfort <benjamin@unboundconcepts.com>
+# URL:     <http://unboundconcepts.com/projects/wim/>
+# Created: Thu Jan 17 15:40:12 2013 -0400
+#
+# Copyright (C) 2012 Unbound Concepts
+# For license information, see LICENSE.TXT
+#
+# ID: evaluation.py [1] benjamin@unboundconepts.com $
+
+"""
+Evaluates the analysis profiles against the examples in the knowledge.
+Every mapping of the knowledge carries an example parse of its frame, so
+the examples make a small gold standard: the template chosen for the
+first verb phrase of an example should be the frame that it exemplifies.
+Each profile is scored on that, and on how many of its WIMs agree with
+those of the accurate profile, which is what the fast profile trades away
+for never touching WordNet while matching.
+"""
+
+__docformat__ = "restructuredtext en"
+
+##########################################################################
+## Imports and Package Dependencies
+##########################################################################
+
+import time
+
+from frame import VerbTemplate, ACCURATE, FAST
+from analyze import WIMAnalyzer, AnalysisStats
+
+##########################################################################
+## Profile Evaluation
+##########################################################################
+
+def examples(knowledge=None):
+    """
+    Yields the frame and example parse of every mapping in the knowledge
+    that has one, in frame order.
+    """
+    knowledge = knowledge or VerbTemplate.knowledge
+    for frame in sorted(knowledge.frames()):
+        for mapping in knowledge[frame]:
+            if mapping.get('parse') is not None:
+                yield frame, str(mapping['parse'])
+
+def evaluate(profile, knowledge=None, repeat=3):
+    """
+    Analyzes every example with a new analyzer of the profile and returns
+    a dictionary of the results: the number of ``examples``, the number
+    of examples whose first verb phrase chose the exemplified frame and
+    their fraction (``frames`` and ``accuracy``), the best ``time`` of
+    repeat passes over the examples (after a warm up pass, so that the
+    lexicon is loaded), and the serialized ``wims`` of the examples.
+    """
+    analyzer = WIMAnalyzer(profile=profile)
+    trees    = [(frame, analyzer.phrase(parse)) for frame, parse in examples(knowledge)]
+
+    frames = 0
+    wims   = []
+    for frame, tree in trees:
+        vp    = next(analyzer.rootVPs(tree), None)
+        match = analyzer.choose(vp, {}, AnalysisStats()) if vp is not None else None
+        if match is not None and match.template.frame == frame:
+            frames += 1
+
+        wim = analyzer.analyze(tree)
+        wims.append(wim.serialize() if wim is not None else None)
+
+    timings = []
+    for idx in xrange(repeat):
+        start = time.time()
+        for frame, tree in trees:
+            analyzer.analyze(tree)
+        timings.append(time.time() - start)
+
+    return {
+        'profile': profile,
+        'examples': len(trees),
+        'frames': frames,
+        'accuracy': float(frames) / len(trees) if trees else 0.0,
+        'time': min(timings) if timings else 0.0,
+        'wims': wims,
+    }
+
+def evaluate_profiles(profiles=(ACCURATE, FAST), knowledge=None, repeat=3):
+    """
+    Evaluates each profile with ``evaluate``, adding the fraction of its
+    WIMs that are identical to the WIMs of the accurate profile as its
+    ``agreement``, and returns the results in the order of profiles.
+    """
+    results   = [evaluate(profile, knowledge, repeat) for profile in profiles]
+    reference = [result for result in results if result['profile'] == ACCURATE]
+    reference = reference[0] if reference else evaluate(ACCURATE, knowledge, repeat)
+
+    for result in results:
+        agree = sum(1 for wim, gold in zip(result['wims'], reference['wims']) if wim == gold)
+        result['agreement'] = float(agree) / len(result['wims']) if result['wims'] else 0.0
+    return results
+
+##########################################################################
+## Main Method for Testing and Demonstration
+##########################################################################
+
+if __name__ == "__main__":
+
+    for result in evaluate_profiles():
+        print "%(profile)-10s %(frames)i/%(examples)i frames (%(accuracy)0.3f) " \
+              "%(agreement)0.3f agreement %(time)0.3fs" % result
@@ -25,9 +25,20 @@ __docformat__ = "epytext en"
 ##########################################################################
 
 import os
+import sys
 import json
+import time
+import cPickle
+import hashlib
+import threading
+
+from cStringIO import StringIO
+from collections import namedtuple
 
 from nltk.tree import Tree 
+from nltk.corpus.reader.wordnet import VERB_FRAME_STRINGS
+
+from phrase import BasePhrase, PHRASE_TYPES
 
 ##########################################################################
 ## Module Static Variables
@@ -35,6 +46,61 @@ from nltk.tree import Tree
 
 KNOWLEDGE_PATH = os.environ.get('WIMKB', None)
 
+# The knowledge read when $WIMKB is not set, installed as the wim.data
+# package by setup.py, or else in the data directory of the source tree
+BUNDLED_PATH   = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'verbframes.json')
+if not os.path.exists(BUNDLED_PATH):
+    BUNDLED_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'data', 'verbframes.json')
+
+# Knowledge precompiled by Knowledge.save begins with this header
+BINARY_FORMAT  = 1
+BINARY_HEADER  = "#wimkb %i\n"
+
+# The only globals that compiled knowledge may refer to when it is loaded
+BINARY_GLOBALS = frozenset([
+    ('__builtin__', 'frozenset'),
+    ('nltk.tree', 'Tree'),
+    ('wim.frame', 'Knowledge'),
+    ('wim.frame', 'VerbTemplate'),
+    ('wim.frame', 'TemplateIndex'),
+    ('wim.frame', 'TemplateTrie'),
+    ('wim.frame', 'Requirements'),
+    ('wim.frame', 'compile_predicates'),
+])
+
+# Held while compiling knowledge so that threads never compile it twice
+_compile_lock = threading.Lock()
+
+# Relative cost of the verbmap predicates, which are checked cheapest first
+CHEAP, MEDIUM, EXPENSIVE = range(3)
+
+PREDICATE_COSTS = {
+    'token':          CHEAP,
+    'gerund':         CHEAP,
+    'infinitive':     CHEAP,
+    'something':      CHEAP,
+    'possesive':      CHEAP,
+    'subject':        MEDIUM,     # Grammatical roles search the tree
+    'directobject':   MEDIUM,
+    'indirectobject': MEDIUM,
+    'somebody':       EXPENSIVE,  # WordNet lookups
+    'bodypart':       EXPENSIVE,
+    'tagsomebody':    CHEAP,      # Tags and word lists
+    'tagbodypart':    CHEAP,
+}
+
+# Analysis profiles, which compile verbmap predicates to alternate methods
+ACCURATE, FAST = "accurate", "fast"
+
+PROFILES = {
+    ACCURATE: {},
+    FAST: {
+        'somebody': 'tagsomebody',
+        'bodypart': 'tagbodypart',
+    },
+}
+
 ##########################################################################
 ## Knowledge
 ##########################################################################
@@ -45,35 +111,110 @@ class Knowledge(object):
     """
     
     @classmethod
-    def read(klass, path=KNOWLEDGE_PATH):
-       
-        if not path:
-            raise Exception("Specify a path to the verbframes.json as $WIMKB")
+    def read(klass, path=None):
+        """
+        Reads the knowledge from a verbframes.json file, or from a binary
+        file written by L{save}. The path defaults to $WIMKB, or else to
+        the verbframes.json bundled in the data directory.
+        """
+        path = path or KNOWLEDGE_PATH or BUNDLED_PATH
 
         with open(path, 'rb') as kbfile:
-            data = json.load(kbfile, encoding="utf8")
+            data = kbfile.read()
+
+        if data.startswith("#wimkb "):
+            return klass.loads(data, path)
+
+        data = json.loads(data, encoding="utf8")
 
-            kwargs = {}
-            for frame in data['frames']:
-                for mapping in frame['mappings']:
-                    # Update mapping with frame object
-                    mapping['frame']   = frame['frame']
+        kwargs = {}
+        for frame in data['frames']:
+            for mapping in frame['mappings']:
+                # Update mapping with frame object
+                mapping['frame']   = frame['frame']
 
-                    # Convert string reprs of Trees
-                    mapping['verbmap'] = Tree.parse(mapping['verbmap'])
+                # Convert string reprs of Trees
+                mapping['verbmap'] = Tree.parse(mapping['verbmap'])
 
-                    if 'parse' in mapping:
-                        mapping['parse']   = Tree.parse(mapping['parse']) 
+                if 'parse' in mapping:
+                    mapping['parse']   = Tree.parse(mapping['parse']) 
 
-                # Convert kwargs
-                kwargs[frame['frame']] = frame['mappings']
+            # Convert kwargs
+            kwargs[frame['frame']] = frame['mappings']
 
         return klass(**kwargs)
 
+    @classmethod
+    def loads(klass, data, path=None):
+        """
+        Loads the knowledge from the contents of a binary file written by
+        L{save}, along with the templates that were compiled into it.
+
+        The file is a pickle, which may only refer to the classes and
+        functions in L{BINARY_GLOBALS}, so loading it never imports or
+        calls anything else. Those are still called with the arguments in
+        the file, though, so only load compiled knowledge that you trust,
+        and read the verbframes.json of knowledge from anywhere else.
+        """
+        header, data = data.split("\n", 1)
+        header = header.split()
+        if header[0] != "#wimkb" or int(header[1]) != BINARY_FORMAT:
+            raise ValueError("%s is not version %i compiled knowledge" % (path or "data", BINARY_FORMAT))
+
+        unpickler = cPickle.Unpickler(StringIO(data))
+        unpickler.find_global = klass._find_global
+
+        try:
+            knowledge = unpickler.load()
+        except cPickle.UnpicklingError as e:
+            raise ValueError("%s is not valid compiled knowledge: %s" % (path or "data", e))
+
+        if not isinstance(knowledge, klass):
+            raise ValueError("%s does not hold compiled knowledge" % (path or "data"))
+        return knowledge
+
+    @staticmethod
+    def _find_global(module, name):
+        if (module, name) not in BINARY_GLOBALS:
+            raise cPickle.UnpicklingError("%s.%s is not allowed in compiled knowledge" % (module, name))
+        __import__(module)
+        return getattr(sys.modules[module], name)
+
+    def save(self, path, profiles=(ACCURATE,), parses=False):
+        """
+        Writes the knowledge to path in a binary form that L{read} loads
+        with a single read, without parsing a tree: the verbmaps are held
+        as trees, and the L{TemplateIndex} of each of the analysis profiles
+        is compiled into the file. The example parses of the mappings are
+        left out unless parses is True.
+
+        @return: The number of bytes written.
+        """
+        knowledge = self
+        if not parses:
+            knowledge = self.__class__(**dict(
+                (frame, [dict((key, value) for key, value in mapping.items() if key != 'parse')
+                         for mapping in mappings])
+                for frame, mappings in self.items()))
+
+        for profile in profiles:
+            knowledge.profile(profile)
+
+        data = BINARY_HEADER % BINARY_FORMAT + cPickle.dumps(knowledge, cPickle.HIGHEST_PROTOCOL)
+
+        tmppath = path + '.tmp'
+        with open(tmppath, 'wb') as kbfile:
+            kbfile.write(data)
+        os.rename(tmppath, path)
+
+        return len(data)
+
     fields = ('frame', 'verbmap', 'wimtemplate', 'example', 'parse')
 
     def __init__(self, **kwargs):
         self.__data = {}
+        self._profiles = {}
+        self._version = None
 
         for frame, values in kwargs.items():
             for value in values:
@@ -97,6 +238,7 @@ class Knowledge(object):
             self.__data[frame].append(values)
         else:
             self.__data[frame] = [values,]
+        self._version = None
 
     def __getitem__(self, frame):
         return self.__data[frame]
@@ -113,39 +255,179 @@ class Knowledge(object):
     def values(self):
         return self.__data.values()
 
-    def lookup(self, frame, lemma=None):
+    @staticmethod
+    def frameid(frame):
+        """
+        Returns the WordNet verb frame id (the index into WordNet's generic
+        verb frames) of a frame in the knowledge, or None if the frame is
+        not one of WordNet's verb frames.
+        """
+        frame = frame.replace("----ing", "%sing").replace("----s", "%s")
+        if frame in VERB_FRAME_STRINGS:
+            return VERB_FRAME_STRINGS.index(frame)
+        return None
+
+    def canonical(self, frame, lemma):
         """
+        Maps a WordNet frame string for a particular lemma onto the frame
+        key that is used by the knowledge, or returns None if the frame is
+        not represented in the knowledge.
+
         @todo: for to be verbs, the lemma doesn't have the attaching "ing"
             so a double ing happens, hence the third replace. Fix this.
         """
-        if lemma:
-            frame_s   = frame.replace(lemma, "----s")
-            frame_ing = frame.replace(lemma, "----ing")
-            frame_ing = frame_ing.replace("----inging", "----ing")
+        frame_s = frame.replace(lemma, "----s")
+        if frame_s in self: return frame_s
+
+        frame_ing = frame.replace(lemma, "----ing")
+        frame_ing = frame_ing.replace("----inging", "----ing")
+        if frame_ing in self: return frame_ing
+
+        return None
+
+    def lookup(self, frame, lemma=None):
+        key = self.canonical(frame, lemma) if lemma else frame
+        if key not in self:
+            raise KeyError("The frame %s is not in knowledge." % frame)
+        return self[key]
+
+    @property
+    def version(self):
+        """
+        A digest of the content of the knowledge, the L{mapping_digest} of
+        every mapping of every frame, which changes whenever a mapping is
+        added, removed or edited.
+        """
+        if self._version is None:
+            digest = hashlib.sha1()
+            for frame in sorted(self.frames()):
+                for mapping in self.digests(frame):
+                    digest.update(mapping)
+            self._version = digest.hexdigest()
+        return self._version
+
+    def digests(self, frame):
+        """
+        The L{mapping_digest} of every mapping of the frame, in order.
+        """
+        return tuple(mapping_digest(mapping['frame'], mapping['verbmap'], mapping['wimtemplate'])
+                     for mapping in self[frame])
+
+    def diff(self, other):
+        """
+        Compares the knowledge with another version of it, returning the
+        sets of frames that were C{added} in the other, C{removed} from it
+        and C{changed}, i.e. whose mappings differ in content or order.
+        """
+        frames = set(self.frames())
+        others = set(other.frames())
+        return {
+            'added':   others - frames,
+            'removed': frames - others,
+            'changed': set(frame for frame in frames & others
+                           if self.digests(frame) != other.digests(frame)),
+        }
+
+    def compile(self, profile=ACCURATE):
+        """
+        Compiles the knowledge into a L{TemplateIndex} of immutable verb
+        templates keyed by the canonical frame, with the predicates of the
+        analysis profile.
+        """
+        return TemplateIndex(self, profile)
+
+    def profile(self, profile=ACCURATE):
+        """
+        The compiled L{TemplateIndex} for this knowledge and profile,
+        compiled only once on first access (by whichever thread gets there
+        first) and shared thereafter.
+        """
+        if profile not in PROFILES:
+            raise ValueError("Unknown analysis profile %r" % profile)
+
+        if profile not in self._profiles:
+            with _compile_lock:
+                if profile not in self._profiles:
+                    self._profiles[profile] = self.compile(profile)
+        return self._profiles[profile]
+
+    @property
+    def templates(self):
+        """
+        The L{TemplateIndex} of the accurate profile.
+        """
+        return self.profile(ACCURATE)
+
+class LazyKnowledge(object):
+    """
+    A class attribute that holds the knowledge read with L{Knowledge.read},
+    which is read the first time the attribute is accessed (by whichever
+    thread gets there first) rather than when the class is defined, so
+    that importing the module reads nothing.
+    """
+
+    def __init__(self, path=None):
+        self.path      = path
+        self.knowledge = None
+        self._lock     = threading.Lock()
 
-        if frame_s in self: return self[frame_s]
-        elif frame_ing in self: return self[frame_ing]
-        else: raise KeyError("The frame %s or %s is not in knowledge." % (frame_s, frame_ing))
+    def __get__(self, instance, owner):
+        if self.knowledge is None:
+            with self._lock:
+                if self.knowledge is None:
+                    self.knowledge = Knowledge.read(self.path)
+        return self.knowledge
 
 class VerbTemplate(object):
     """
-    @todo: Have knowledge store VerbTemplate objects instead of a dict
+    An immutable, compiled verb frame mapping. Templates are built once
+    from the knowledge by the L{TemplateIndex} and shared between every
+    verb phrase that is matched against them, so matching must never
+    store state on the template itself.
     """
 
-    knowledge = Knowledge.read()
-    
-    def __init__(self, frame, lemma):
+    knowledge = LazyKnowledge()
 
-        fields = self.knowledge.lookup(frame, lemma)[0] # Temporary
+    @classmethod
+    def compile(klass, fields, profile=ACCURATE, mapping=0):
+        """
+        Builds a template from a mapping dictionary in the knowledge, the
+        mapping-th mapping of its frame.
+        """
+        return klass(fields['frame'], fields['verbmap'], fields['wimtemplate'],
+                     fields.get('example'), fields.get('parse'), profile, mapping)
 
-        self.frame       = fields['frame']
-        self.verbmap     = fields['verbmap']
-        self.wimtemplate = fields['wimtemplate'].split(" ")
-        self.example     = fields['example']
-        self.parse       = fields['parse']
-        self.sense       = None
+    def __init__(self, frame, verbmap, wimtemplate, example=None, parse=None, profile=ACCURATE, mapping=0):
+        self.__dict__.update({
+            'frame':       frame,
+            'mapping':     mapping,
+            'verbmap':     verbmap,
+            'wimtemplate': tuple(wimtemplate.split(" ")),
+            'example':     example,
+            'parse':       parse,
+            'profile':     profile,
+            'digest':      mapping_digest(frame, verbmap, wimtemplate),
+            'size':        len(self.split_frame(frame)),
+            'pattern':     compile_pattern(verbmap, profile),
+        })
+        self.__dict__['requirements'] = Requirements(self.pattern, self.size)
 
-        self.constituents = [] # REMOVE!!! THIS IS SO BAD
+    def __setattr__(self, name, value):
+        raise AttributeError("VerbTemplate objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("VerbTemplate objects are immutable")
+
+    def predicates(self):
+        """
+        Iterates over the compiled predicates of every node of the verbmap.
+        """
+        stack = [self.pattern]
+        while stack:
+            label, predicates, children = stack.pop()
+            for predicate in predicates or ():
+                yield predicate
+            stack.extend(children)
 
     def split_frame(self, frame):
         """
@@ -159,45 +441,58 @@ class VerbTemplate(object):
         return tmp
 
     def match(self, verbphrase):
-        
-        # Get the constituent bits of the phrase
+        """
+        Matches the template against the clause of the verb phrase and
+        returns a L{TemplateMatch} (without senses), or None if the
+        template does not match. Neither the template nor the tree are
+        modified.
+        """
+        clause       = verbphrase.findparent('CL')
+        bindings     = unique_bindings(search_pattern(clause, self.pattern[2], {}))
+        constituents = self.check(verbphrase, bindings)
+        if constituents is None:
+            return None
+        return TemplateMatch(self, (), constituents)
 
-        self.constituents = phrase = list(verbphrase.constituents(self.verbmap))
+    def check(self, verbphrase, bindings, stats=None):
+        """
+        Checks the constituents bound by the verbmap of this template (as
+        found by L{search_pattern} or a L{TemplateTrie}) against the
+        compiled predicates of the verbmap, and returns the tuple of
+        constituents, or None if the template does not match.
 
-        if len(phrase) != len(self.split_frame(self.frame)):
-            return False
+        Every cheap predicate of every constituent is checked before any
+        medium one, and those before any expensive one, so that most
+        templates are rejected without touching WordNet.
+
+        @param stats: If a dictionary is given, the number of calls and
+            the total time of each predicate are kept in it as lists of
+            C{[calls, seconds]} keyed by predicate name.
+        """
+        if len(bindings) != self.size:
+            return None
 
         # If the constituents don't match the verb map, we're done.
-        for constituent in phrase:
-            if constituent._bits:
-                attrs = constituent._bits.split(',')
-                for attr in attrs:
-                    if attr == "head": continue
-                    fparts = attr.split(":")
-                    attr   = fparts[0]
-                    if len(fparts) > 1:
-                        param = [verbphrase, fparts[1]]
-                    else:
-                        param = [verbphrase,]
+        for cost in (CHEAP, MEDIUM, EXPENSIVE):
+            for constituent, predicates in bindings:
+                if not predicates: continue
+                for predicate in predicates:
+                    if predicate.cost != cost: continue
 
-                    # This will raise an exception if not done right
-                    attr = getattr(constituent, attr)
-                    if callable(attr):
-                        if not attr(*param):
-                            if self.frame == "Something is ----ing PP": pass
-                                #print verbphrase
-#                                print "Failed on: %s" % self.frame
-#                                print "\tChecking %s with params: %s" % (attr.__name__, param)
-#                                print "\t On: %s" % (constituent,)
+                    if stats is None:
+                        result = predicate.function(constituent, verbphrase, *predicate.args)
+                    else:
+                        start  = time.time()
+                        result = predicate.function(constituent, verbphrase, *predicate.args)
+                        counts = stats.setdefault(predicate.name, [0, 0.0])
+                        counts[0] += 1
+                        counts[1] += time.time() - start
 
- #                               print 
+                    if not result:
+                        return None
 
-#                                for ct in phrase:
-#                                    print "%s: %s" % (ct._bits, ct.text())
-                            return False
+        return tuple(constituent for constituent, predicates in bindings)
 
-        return True
-                
     def addproperties(self, vp, wim):
         for idx, map in enumerate(self.mappedcomponents):
             meaning = self.mappedmeanings[idx]
@@ -212,19 +507,565 @@ class VerbTemplate(object):
             else:
                 #print "--WARNING: didn't know how to add property for %s" % map
                 pass
-        
+
     def __str__(self):
         return self.frame
 
-if __name__ == "__main__":
+class TemplateIndex(dict):
+    """
+    The knowledge compiled into immutable L{VerbTemplate} objects, held in
+    a dictionary keyed by the canonical frame of the knowledge, whose
+    values are the tuple of templates compiled from every mapping of the
+    frame, in knowledge order. Every mapping of a frame is a candidate for
+    the frame, so the cost of matching a verb phrase grows with every
+    mapping. An alternative mapping shares the search of the structure its
+    verbmap has in common with the others in the L{trie}, but its bindings
+    are still collected and checked on their own, and it costs about as
+    much as searching its verbmap alone with a memo shared by the other
+    candidates (see C{tests/bench_mappings.py}).
+    
+    The templates are also indexed by WordNet verb frame id in L{byid}, so
+    that the frame ids of a lemma (C{lemma.frame_ids}) resolve with a
+    single list index; ids that the knowledge does not support hold None
+    and are collected in L{unsupported}. WordNet frame strings can still
+    be resolved to templates with L{lookup}.
+    """
+
+    def __init__(self, knowledge, profile=ACCURATE):
+        super(TemplateIndex, self).__init__()
+        self.knowledge = knowledge
+        self.profile   = profile
+        self.byid      = [None] * len(VERB_FRAME_STRINGS)
+
+        for frame, mappings in knowledge.items():
+            self[frame] = tuple(VerbTemplate.compile(fields, profile, idx)
+                                for idx, fields in enumerate(mappings))
+
+            frameid = knowledge.frameid(frame)
+            if frameid is not None:
+                self.byid[frameid] = self[frame]
+
+        self.unsupported = frozenset(frameid for frameid, templates in enumerate(self.byid)
+                                     if templates is None)
+        self.trie        = TemplateTrie(self.itertemplates())
+        self.repeatable  = frozenset(label for template in self.itertemplates()
+                                     for label in template.requirements.repeatable)
+
+    def itertemplates(self):
+        """
+        Iterates over every template of every frame.
+        """
+        for templates in self.itervalues():
+            for template in templates:
+                yield template
+
+    def lookup(self, frame, lemma):
+        """
+        Returns the templates for a WordNet frame string and lemma, or None
+        if the frame is not in the knowledge.
+        """
+        key = self.knowledge.canonical(frame, lemma)
+        if key is None:
+            return None
+        return self[key]
+
+    def producing(self, relations):
+        """
+        Returns the templates whose wimtemplate has at least one of the
+        relations, e.g. C{("AGENT", "THEME")}; the other templates can never
+        add one of those relations to a WIM.
+        """
+        relations = frozenset(relations)
+        return frozenset(template for template in self.itertemplates()
+                         if relations.intersection(template.wimtemplate))
+
+    def match(self, verbphrase, templates=None, memo=None):
+        """
+        Matches every template, or only the templates given, against the
+        clause of the verb phrase with a single walk of the L{trie}, and
+        returns a L{TemplateMatch} (without senses) for each template that
+        matches, in the order of templates if given. Neither the templates
+        nor the tree are modified, so both can be shared between threads.
+        """
+        clause    = verbphrase.findparent('CL')
+        templates = list(templates if templates is not None else self.itertemplates())
+        templates = self.admissible(clause, templates, memo)
+        bindings  = self.trie.bindings(clause, templates, memo)
+
+        matches = []
+        for template in templates:
+            constituents = template.check(verbphrase, bindings[template])
+            if constituents is not None:
+                matches.append(TemplateMatch(template, (), constituents))
+        return tuple(matches)
+
+    def fingerprint(self, clause, memo=None):
+        """
+        Returns the L{ClauseFingerprint} of the clause, memoized in memo.
+        """
+        if memo is None:
+            return ClauseFingerprint.compute(clause, self.repeatable)
 
-    from phrase import BasePhrase
+        key = ('fingerprint', id(clause))
+        if key not in memo:
+            memo[key] = ClauseFingerprint.compute(clause, self.repeatable)
+        return memo[key]
+
+    def admissible(self, clause, templates, memo=None):
+        """
+        Filters the templates down to those whose L{Requirements} the
+        clause meets, in order. Templates that are filtered out cannot
+        match the clause, so need never be searched for or checked.
+        """
+        fingerprint = self.fingerprint(clause, memo)
+        return [template for template in templates if template.requirements.admits(fingerprint)]
+
+def mapping_digest(frame, verbmap, wimtemplate):
+    """
+    A digest of the parts of a mapping that decide what it matches and
+    what it adds to a WIM: its frame, verbmap and wimtemplate. The digest
+    identifies the template compiled from the mapping across versions of
+    the knowledge.
+    """
+    verbmap = u" ".join(unicode(verbmap).split())
+    content = u"\0".join((frame, verbmap, wimtemplate))
+    return hashlib.sha1(content.encode('utf8')).hexdigest()
+
+##########################################################################
+## Verbmap Requirements
+##########################################################################
+
+# Bit positions of the clause features that are required by any verbmap
+_features = {}
+
+def feature_bits(features, add=False):
+    """
+    Returns the mask of the bits of the features, e.g. C{('token', 'is')}
+    or C{('label', 'PP')}. Features required by a verbmap are assigned a
+    bit with add; features that no verbmap requires have no bit.
+    """
+    mask = 0
+    for feature in features:
+        if feature not in _features:
+            if not add: continue
+            _features[feature] = len(_features)
+        mask |= 1 << _features[feature]
+    return mask
+
+class Requirements(object):
+    """
+    The features that a clause must have for a verbmap to match it: the
+    lowercase tokens of its token predicates, and a descendant phrase for
+    every node of the verbmap with the node's label.
+
+    These are only necessary when every node of the verbmap has to bind a
+    different phrase, which is the case when no phrase of the clause has
+    two children with the same label as a verbmap node with children (a
+    I{repeatable} label, since such a node binds every matching sibling)
+    and the size of the template is the number of nodes of the verbmap
+    that bind phrases. Templates larger than that can only match clauses
+    with repeats, and smaller templates are never filtered.
+
+    @ivar features: The required tokens and labels, e.g. C{('token', 'is')}.
+    @ivar mask: The bits of the required tokens and labels.
+    @ivar counts: The labels required more than once, with their counts.
+    @ivar repeatable: The labels of the nodes of the verbmap with children.
+    """
+
+    def __init__(self, pattern, size):
+        labels     = {}
+        tokens     = set()
+        repeatable = set()
+        binds      = 0
+
+        stack = list(pattern[2])
+        while stack:
+            label, predicates, children = stack.pop()
+            labels[label] = labels.get(label, 0) + 1
+            if children:
+                repeatable.add(label)
+            if predicates is not None or not children:
+                binds += 1
+
+            for predicate in predicates or ():
+                if predicate.name == 'token':
+                    tokens.update(predicate.args[0].strip().strip('"').lower().split())
+            stack.extend(children)
+
+        features = [('label', label) for label in labels] + [('token', token) for token in tokens]
+
+        self.features   = frozenset(features)
+        self.filters    = size == binds
+        self.impossible = size > binds
+        self.mask       = feature_bits(features, add=True) if self.filters else 0
+        self.counts     = tuple((label, count) for label, count in sorted(labels.items())
+                                if count > 1) if self.filters else ()
+        self.repeatable = frozenset(repeatable)
+
+    def __getstate__(self):
+        # Feature bits are assigned per process, so the mask is not saved
+        state = dict(self.__dict__)
+        del state['mask']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.mask = feature_bits(self.features, add=True) if self.filters else 0
+
+    def admits(self, fingerprint):
+        """
+        Returns False if the clause of the fingerprint cannot be matched.
+        """
+        if fingerprint.repeats:
+            return True
+        if self.impossible:
+            return False
+        if self.mask & ~fingerprint.mask:
+            return False
+        for label, count in self.counts:
+            if fingerprint.labels.get(label, 0) < count:
+                return False
+        return True
+
+class ClauseFingerprint(namedtuple('ClauseFingerprint', 'tokens labels repeats mask')):
+    """
+    A cheap summary of a clause to check L{Requirements} against: the set
+    of its lowercase tokens, the number of its descendant phrases with
+    each label, whether any phrase in it has two children with the same
+    repeatable label, and the mask of the bits of its features.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def compute(klass, clause, repeatable):
+        tokens  = frozenset(token.lower() for token in clause.leaves())
+        labels  = {}
+        repeats = False
+
+        stack = [clause]
+        while stack:
+            phrase   = stack.pop()
+            children = [child for child in phrase if isinstance(child, Tree)]
+
+            seen = set()
+            for child in children:
+                labels[child.node] = labels.get(child.node, 0) + 1
+                if child.node in repeatable:
+                    repeats = repeats or child.node in seen
+                    seen.add(child.node)
+            stack.extend(children)
+
+        features = [('label', label) for label in labels] + [('token', token) for token in tokens]
+        return klass(tokens, labels, repeats, feature_bits(features))
+
+##########################################################################
+## Verbmap Patterns
+##########################################################################
+
+Predicate = namedtuple('Predicate', 'name cost function args')
+
+class Predicates(tuple):
+    """
+    The tuple of L{Predicate} entries compiled by L{compile_predicates}
+    from the annotations of a verbmap node. The functions of predicates
+    can't be pickled, so the tuple is pickled as the arguments that it was
+    compiled from, and unpickles as the shared tuple compiled from them.
+
+    @ivar key: The label, bits and profile the tuple was compiled from.
+    """
+
+    def __new__(klass, predicates, key):
+        self = super(Predicates, klass).__new__(klass, predicates)
+        self.key = key
+        return self
+
+    def __reduce__(self):
+        return (compile_predicates, self.key)
+
+# Compiled predicates shared by every verbmap, keyed by label and bits
+_predicates = {}
+
+def compile_pattern(verbmap, profile=ACCURATE):
+    """
+    Compiles a verbmap into a nested, hashable pattern tuple of the form
+    C{(label, predicates, children)}, where predicates is None if the node
+    has no functional annotations (nothing after an "="), or else the
+    tuple returned by L{compile_predicates} for them.
+    """
+    parts      = verbmap.node.split("=")
+    predicates = compile_predicates(parts[0], parts[1], profile) if len(parts) > 1 else None
+    children   = tuple(compile_pattern(child, profile) for child in verbmap)
+    return (parts[0], predicates, children)
+
+def compile_predicates(label, bits, profile=ACCURATE):
+    """
+    Parses the functional annotations of a verbmap node, e.g. the bits
+    C{subject,token:"it"} of C{NP=subject,token:"it"}, into
+    L{Predicates}, where the function is the method of the phrase type
+    that the label converts to, called with the constituent, the verb
+    phrase and args. The "head" annotation and attributes that aren't
+    callable are not checked, and so are left out.
+
+    If the phrase type has no such method the predicate looks it up on the
+    constituent when called, raising the same error it always has.
+
+    The profile may substitute another method of the phrase type for a
+    predicate, e.g. C{tagsomebody} for C{somebody}; the predicate keeps
+    its name but takes the function and cost of the substitute.
+    """
+    key = (label, bits, profile)
+    if key not in _predicates:
+        klass      = PHRASE_TYPES.get(label, BasePhrase)
+        predicates = []
+        for attr in bits.split(','):
+            if attr == "head": continue
+            fparts = attr.split(":")
+            name   = str(fparts[0])
+            method = PROFILES[profile].get(name, name)
+            args   = (fparts[1],) if len(fparts) > 1 else ()
+
+            if not hasattr(klass, method):
+                method = name
+
+            if hasattr(klass, method):
+                function = getattr(klass, method)
+                if not callable(function): continue
+                function = getattr(function, 'im_func', function)
+            else:
+                function = unresolved_predicate(name)
+
+            predicates.append(Predicate(name, PREDICATE_COSTS.get(method, MEDIUM), function, args))
+        _predicates[key] = Predicates(predicates, key)
+    return _predicates[key]
+
+def unresolved_predicate(name):
+    """
+    A predicate that resolves the method name on the constituent itself.
+    """
+    def predicate(constituent, verbphrase, *args):
+        return getattr(constituent, name)(verbphrase, *args)
+    return predicate
+
+def search_pattern(node, patterns, memo):
+    """
+    Matches a sequence of compiled patterns against the children of node
+    exactly as C{BasePhrase.pattern_search} does, but rather than storing
+    the bits on the matched phrases, returns a list of C{(phrase,
+    predicates)} bindings. Results are memoized by node and patterns in memo.
+    """
+    key = (id(node), patterns)
+    if key not in memo:
+        idx      = 0
+        bindings = []
+        for pattern in patterns:
+            idx, found = search_step(node, idx, pattern, memo)
+            bindings.extend(found)
+        memo[key] = bindings
+    return memo[key]
+
+def search_step(node, idx, pattern, memo):
+    """
+    Matches one compiled pattern against the children of node starting at
+    idx, returning the index to continue from and the bindings found.
+    """
+    label, predicates, children = pattern
+    bindings = []
+    for child in node[idx:]:
+        idx += 1
+        if label == child.node:
+            if not children:
+                bindings.append((child, predicates))
+                break
+            if predicates is not None:
+                bindings.append((child, predicates))
+            bindings.extend(search_pattern(child, children, memo))
+    return idx, bindings
+
+def unique_bindings(bindings):
+    """
+    Drops the bindings of phrases already bound earlier. Phrases are told
+    apart by identity, not by (deep) tree equality.
+    """
+    seen    = set()
+    uniques = []
+    for phrase, predicates in bindings:
+        if id(phrase) not in seen:
+            seen.add(id(phrase))
+            uniques.append((phrase, predicates))
+    return uniques
+
+class TemplateTrie(object):
+    """
+    Every verbmap compiled into a trie over the structure of its patterns,
+    so that verbmaps share the search of every part of the clause that
+    their structures have in common, whatever their predicates.
+
+    Each level of the trie matches a sequence of sibling patterns, with an
+    edge for the label of the next pattern and whether it has children;
+    the edge of a pattern with children also leads into the trie of the
+    sequences of its children, which is walked in every phrase the pattern
+    matches. The predicates of each template are carried on the edges as
+    its payload, and only given to the bindings once the walk is done, so
+    e.g. C{(NP=subject,somebody)} and C{(NP=subject,something)} share an
+    edge and C{(VP=head (NP=directobject,somebody))} and C{(VP=head (NP=
+    directobject,something) (PP))} share the search of the phrase they
+    bind in the verb phrase.
+    """
+
+    class Node(object):
+
+        def __init__(self):
+            self.edges     = []             # List of ((label, leaf), Node)
+            self.payload   = {}             # Predicates of each template on the edge to here
+            self.inner     = None           # Trie of the children of the pattern on the edge
+            self.templates = []             # Templates whose sequence ends at this node
+            self.below     = set()          # Templates at or under this node
+
+        def child(self, label, leaf):
+            for edge, node in self.edges:
+                if edge == (label, leaf):
+                    return node
+            node = TemplateTrie.Node()
+            self.edges.append(((label, leaf), node))
+            return node
+
+        def insert(self, template, patterns):
+            node = self
+            node.below.add(template)
+            for label, predicates, children in patterns:
+                node = node.child(label, not children)
+                node.below.add(template)
+                node.payload[template] = predicates
+                if children:
+                    node.inner = node.inner or TemplateTrie.Node()
+                    node.inner.insert(template, children)
+            node.templates.append(template)
+
+    def __init__(self, templates):
+        self.templates = tuple(templates)
+        self.root      = self.Node()
+        for template in self.templates:
+            self.root.insert(template, template.pattern[2])
+
+    def __reduce__(self):
+        # The trie is built again from its templates when it is unpickled
+        return (self.__class__, (self.templates,))
+
+    def bindings(self, clause, templates=None, memo=None):
+        """
+        Walks the clause once and returns a dictionary mapping each template
+        to the unique bindings of its verbmap in the clause, which can be
+        checked with L{VerbTemplate.check}. If templates is given, only the
+        branches of the trie leading to those templates are walked.
+
+        The bindings are memoized by clause and verbmap in memo, so that
+        passing the same memo for every verb phrase of a sentence walks
+        each clause at most once per verbmap, and templates that share a
+        verbmap share its bindings. The search of each pattern structure is
+        memoized too, so a later walk for other templates only searches the
+        parts of their structure not searched before. Since phrases are
+        memoized by identity the memo must not outlive the tree.
+        """
+        memo    = memo if memo is not None else {}
+        wanted  = set(templates) if templates is not None else set(self.root.below)
+        pending = set(template for template in wanted
+                      if ('verbmap', id(clause), template.pattern[2]) not in memo)
+
+        if pending:
+            for template, found in self._walk(self.root, clause, 0, pending, memo).iteritems():
+                bindings = []
+                for phrase, node in found:
+                    predicates = node.payload[template]
+                    if predicates is not None or node.inner is None:
+                        bindings.append((phrase, predicates))
+                memo['verbmap', id(clause), template.pattern[2]] = unique_bindings(bindings)
+
+        return dict((template, memo['verbmap', id(clause), template.pattern[2]]) for template in wanted)
+
+    def _walk(self, node, phrase, idx, wanted, memo):
+        """
+        Returns the bindings of the sequences of the wanted templates under
+        node in the children of phrase from idx, as C{(phrase, node)} pairs
+        whose node has the payload of the template.
+        """
+        results = dict((template, []) for template in node.templates if template in wanted)
+
+        for (label, leaf), child in node.edges:
+            if wanted.isdisjoint(child.below):
+                continue
+
+            nidx, matched = self._step(phrase, idx, label, leaf, memo)
+            rest = self._walk(child, phrase, nidx, wanted, memo)
+
+            inner = [self._walk(child.inner, match, 0, wanted, memo) if not leaf else None
+                     for match in matched]
+
+            for template, bindings in rest.iteritems():
+                found = []
+                for match, nested in zip(matched, inner):
+                    found.append((match, child))
+                    if nested is not None:
+                        found.extend(nested[template])
+                results[template] = found + bindings
+        return results
+
+    @staticmethod
+    def _step(phrase, idx, label, leaf, memo):
+        """
+        Matches a pattern with the label against the children of phrase
+        from idx as L{search_step} does, and returns the index to continue
+        from and the children matched, memoized by phrase and structure.
+        """
+        key = ('step', id(phrase), idx, label, leaf)
+        if key not in memo:
+            matched = []
+            for child in phrase[idx:]:
+                idx += 1
+                if label == child.node:
+                    matched.append(child)
+                    if leaf: break
+            memo[key] = (idx, matched)
+        return memo[key]
+
+##########################################################################
+## Template Matches
+##########################################################################
+
+class TemplateMatch(namedtuple('TemplateMatch', 'template senses constituents')):
+    """
+    The immutable result of matching a verb phrase: the L{VerbTemplate}
+    that matched, the tuple of the names of every synset that proposed it
+    in the order they proposed it (empty if the template was matched on
+    its own), and the tuple of constituents bound by the verbmap of the
+    template.
+    """
+
+    __slots__ = ()
+
+    @property
+    def sense(self):
+        """
+        The first synset that proposed the template, or None.
+        """
+        return self.senses[0] if self.senses else None
+
+    @property
+    def roles(self):
+        """
+        The constituents paired with their role in the wimtemplate, e.g.
+        C{(('AGENT', np), ('HEAD', vp), ...)}; roles of "X" are included.
+        Constituents beyond the end of the wimtemplate have no role.
+        """
+        return tuple(zip(self.template.wimtemplate, self.constituents))
+
+if __name__ == "__main__":
 
     sentence = BasePhrase("(S (S (CL (NP (DET (DT the)) (NP (N man)))(VP (V hit)(NP (DET (DT the)) (NP (N building))))))(PUNCT .))")
-    frame    = VerbFrame("Somebody hit something", "hit")
+    frame    = VerbTemplate.knowledge.templates.lookup("Somebody hit something", "hit")
     phrase   = list(sentence.findall('VP'))[0]
 
-    if frame.match(phrase):
+    if any(template.match(phrase) is not None for template in frame):
         print "pass"
     else:
         print "fail"
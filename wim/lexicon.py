@@ -0,0 +1,239 @@
+# wim.lexicon
+# Wim: Verb Sense Resolution
+#
+# Author:  Jesse English <jesse@unboundconcepts.com>
+#          Benjamin Bengfort <benjamin@unboundconcepts.com>
+# URL:     <http://unboundconcepts.com/projects/wim/>
+# Created: Mon Jan 07 11:12:31 2013 -0400
+#
+# Copyright (C) 2012 Unbound Concepts
+# For license information, see LICENSE.TXT
+#
+# ID: lexicon.py [1] benjamin@unboundconepts.com $
+
+"""
+Resolution of the head text of a verb phrase into its WordNet verb senses
+and the candidate verb templates that each sense proposes. Resolving a
+head requires morphy lookups and WordNet file seeks, and the same handful
+of verbs account for most of the verb phrases in any corpus, so the
+resolutions are held in a bounded LRU cache that can optionally be
+persisted to disk between runs.
+"""
+
+__docformat__ = "restructuredtext en"
+
+##########################################################################
+## Imports and Package Dependencies
+##########################################################################
+
+import os
+import json
+
+from collections import namedtuple
+from nltk.corpus import wordnet as wn
+
+from frame import VerbTemplate, ACCURATE
+from utils import WORDNET_LOCK
+from utils.containers import LRUCache
+
+##########################################################################
+## Module Static Variables
+##########################################################################
+
+DEFAULT_CAPACITY = 10000
+TABLE_PATH       = os.environ.get('WIMTABLE', None)
+
+# The verb detachment rules used by WordNet's morphy
+SUBSTITUTIONS = (
+    ('s', ''), ('ies', 'y'), ('es', 'e'), ('es', ''),
+    ('ed', 'e'), ('ed', ''), ('ing', 'e'), ('ing', ''),
+)
+
+##########################################################################
+## Verb Senses
+##########################################################################
+
+VerbSense = namedtuple('VerbSense', 'synset lemma templates')
+
+class VerbLexicon(object):
+    """
+    Resolves the (inflected) head text of a verb phrase into a tuple of
+    ``VerbSense`` objects: the synset name, the lemma name and the tuple
+    of candidate ``VerbTemplate`` objects proposed by the frames of that
+    lemma (every mapping of each frame). Senses that propose no templates
+    are omitted.
+
+    ..  note:: The persistence file stores the canonical frame keys of
+        the templates, not the templates themselves; frames that are no
+        longer in the knowledge are dropped when the file is loaded.
+
+    :ivar cache: The ``LRUCache`` of resolutions keyed by head text.
+    :ivar path: The optional path of the persistence file.
+    """
+
+    _defaults   = {}
+    _exceptions = None
+
+    @classmethod
+    def default(klass, profile=ACCURATE):
+        """
+        The lexicon shared by every analyzer of the analysis profile that
+        is not given its own. If a compiled verb table is specified as
+        $WIMTABLE, the shared lexicon resolves against the table instead
+        of WordNet.
+        """
+        if profile not in klass._defaults:
+            templates = VerbTemplate.knowledge.profile(profile)
+            if TABLE_PATH:
+                from verbtable import VerbTable
+                klass._defaults[profile] = VerbTable(TABLE_PATH, templates)
+            else:
+                klass._defaults[profile] = klass(templates)
+        return klass._defaults[profile]
+
+    def __init__(self, templates=None, capacity=DEFAULT_CAPACITY, path=None):
+        self.templates = templates or VerbTemplate.knowledge.templates
+        self.cache     = LRUCache(capacity)
+        self.path      = path
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    @property
+    def hits(self):
+        return self.cache.hits
+
+    @property
+    def misses(self):
+        return self.cache.misses
+
+    def resolve(self, text):
+        """
+        Returns the senses for the head text, from the cache if possible.
+        Safe to call from many threads; a head missed by two threads at
+        once is simply looked up twice.
+
+        :param text: The head text of a verb phrase, e.g. "took"
+        :type text: ``basestring``
+
+        :rtype: ``tuple(VerbSense)``
+        """
+        text = text.lower()
+        try:
+            return self.cache[text]
+        except KeyError:
+            senses = self.cache[text] = self.lookup(text)
+            return senses
+
+    def lookup(self, text):
+        """
+        Resolves the head text against WordNet, bypassing the cache.
+
+        :rtype: ``tuple(VerbSense)``
+        """
+        byid   = self.templates.byid
+        senses = []
+
+        with WORDNET_LOCK:
+            synsets = wn.synsets(text, pos=wn.VERB)
+
+        for synset in synsets:
+            for lemma in synset.lemmas:
+                templates = []
+                for frameid in lemma.frame_ids:
+                    if byid[frameid] is not None:
+                        templates.extend(byid[frameid])
+                if templates:
+                    senses.append(VerbSense(synset.name, lemma.name, tuple(templates)))
+        return tuple(senses)
+
+    def base_forms(self, text):
+        """
+        Returns every form that morphy could lemmatize the head text to:
+        the text itself, its forms in the verb exception list and every
+        form reached by repeatedly applying the detachment rules. This is
+        a superset of the lemmas WordNet would return, computed without
+        looking any of them up, so that heads can be filtered by lemma
+        before paying for a WordNet lookup.
+
+        :rtype: ``set(basestring)``
+        """
+        text  = text.lower()
+        forms = set([text])
+        forms.update(self.exceptions().get(text, ()))
+
+        stack = [text]
+        while stack:
+            form = stack.pop()
+            for old, new in SUBSTITUTIONS:
+                if form.endswith(old):
+                    base = form[:-len(old)] + new
+                    if base and base not in forms:
+                        forms.add(base)
+                        stack.append(base)
+        return forms
+
+    def exceptions(self):
+        """
+        The verb exception list of WordNet, mapping an irregular form to
+        its base forms, read once and shared by every lexicon.
+        """
+        if VerbLexicon._exceptions is None:
+            exceptions = {}
+            with WORDNET_LOCK:
+                for line in wn.open('verb.exc'):
+                    terms = line.split()
+                    if terms:
+                        exceptions[terms[0]] = tuple(terms[1:])
+            VerbLexicon._exceptions = exceptions
+        return VerbLexicon._exceptions
+
+    def load(self, path=None):
+        """
+        Loads previously saved resolutions into the cache.
+        """
+        with open(path or self.path, 'rb') as cachefile:
+            data = json.load(cachefile)
+
+        for text, senses in data:
+            resolved = []
+            for synset, lemma, frames in senses:
+                templates = tuple(template for frame in frames if frame in self.templates
+                                  for template in self.templates[frame])
+                if templates:
+                    resolved.append(VerbSense(synset, lemma, templates))
+            self.cache[text] = tuple(resolved)
+
+    def save(self, path=None):
+        """
+        Writes the resolutions in the cache to the persistence file, from
+        least to most recently used so that a reload keeps the ordering.
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("No path specified to save the lexicon to")
+
+        data = []
+        for text, senses in self.cache.items():
+            data.append((text, [(sense.synset, sense.lemma, self.frames(sense.templates))
+                                for sense in senses]))
+
+        tmppath = path + '.tmp'
+        with open(tmppath, 'wb') as cachefile:
+            json.dump(data, cachefile)
+        os.rename(tmppath, path)
+
+    @staticmethod
+    def frames(templates):
+        """
+        The unique frames of the templates, in order; the templates of a
+        sense are every mapping of these frames.
+        """
+        frames = []
+        for template in templates:
+            if template.frame not in frames:
+                frames.append(template.frame)
+        return frames
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.cache)
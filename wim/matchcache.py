@@ -0,0 +1,233 @@
+# wim.matchcache
+# Wim: Cross-Sentence Match Cache
+#
+# Author:  Jesse English <jesse@unboundconcepts.com>
+#          Benjamin Bengfort <benjamin@unboundconcepts.com>
+# URL:     <http://unboundconcepts.com/projects/wim/>
+# Created: Wed Jan 16 10:02:47 2013 -0400
+#
+# Copyright (C) 2012 Unbound Concepts
+# For license information, see LICENSE.TXT
+#
+# ID: matchcache.py [1] benjamin@unboundconepts.com $
+
+"""
+A cache of the template chosen for a verb phrase, shared between the
+sentences of a corpus. Corpora repeat the same clause shapes constantly
+("He said ...", "The company reported ..."), and every input to template
+matching other than the words themselves is a function of the shape of
+the clause. So the cache key abstracts the words of the clause away,
+keeping only what the verbmap predicates can observe of them:
+
+    - the head text of the verb phrase, which decides the candidates
+    - the labels of the clause and the position of the verb phrase in it
+    - which words are equal to each other, since the grammatical role
+      predicates compare phrases by (deep) equality
+    - the lowercase words that token predicates test for
+    - the WordNet (or in the fast profile, word list) classification of
+      the head of every noun phrase that the somebody or bodypart
+      predicates of a candidate template would check
+
+Two verb phrases with the same key are matched identically, so a hit
+replays the cached choice on the phrases at the same positions.
+"""
+
+__docformat__ = "restructuredtext en"
+
+##########################################################################
+## Imports and Package Dependencies
+##########################################################################
+
+from nltk.tree import Tree
+
+from frame import TemplateMatch, FAST
+from phrase import NounPhrase
+from utils.containers import LRUCache
+
+##########################################################################
+## Module Static Variables
+##########################################################################
+
+DEFAULT_CAPACITY = 10000
+
+# The WordNet classifiers used by the noun phrase predicates
+CLASSIFIERS = {
+    'somebody': 'animal.n.01',
+    'bodypart': 'body_part.n.01',
+}
+
+# Marks a key that is not in the cache (None caches "no match")
+MISSING = object()
+
+##########################################################################
+## Match Cache
+##########################################################################
+
+class MatchCache(object):
+    """
+    An LRU cache of the ``TemplateMatch`` chosen for a verb phrase (or
+    None, if no template matched), keyed by the shape of its clause.
+    The constituents of a match are stored as paths from the clause so
+    that they can be rebound to the phrases of another sentence.
+
+    :ivar cache: The ``LRUCache`` of choices keyed by clause shape.
+    :ivar lexical: The ``LRUCache`` of WordNet classifications by text.
+    """
+
+    def __init__(self, templates, capacity=DEFAULT_CAPACITY):
+        self.templates  = templates
+        self.cache      = LRUCache(capacity)
+        self.lexical    = LRUCache(capacity)
+
+        # Only the words tested by token predicates are kept in the key
+        self.tokens     = frozenset(token for template in templates.itertemplates()
+                                    for label, token in template.requirements.features
+                                    if label == 'token')
+        names           = set(predicate.name for template in templates.itertemplates()
+                              for predicate in template.predicates())
+        self.classifiers = tuple(sorted(CLASSIFIERS[name] for name in names if name in CLASSIFIERS))
+
+        # The templates with predicates that classify the phrases they bind
+        self.classifying = frozenset(template for template in templates.itertemplates()
+                                     if any(predicate.name in CLASSIFIERS
+                                            for predicate in template.predicates()))
+
+        # The fast profile classifies by word lists rather than WordNet
+        self.lexicalmatch = NounPhrase.wordmatch if templates.profile == FAST else NounPhrase.synmatch
+
+    @property
+    def hits(self):
+        return self.cache.hits
+
+    @property
+    def misses(self):
+        return self.cache.misses
+
+    @property
+    def hit_rate(self):
+        return self.cache.hit_rate
+
+    def key(self, vp, clause, candidates=None, memo=None):
+        """
+        Computes the key of the verb phrase in its clause. If the candidate
+        templates of the verb phrase are given, only the noun phrases that
+        their classifying predicates bind are classified (see ``classified``),
+        or else every noun phrase of the clause is.
+
+        :param memo: The verbmap bindings memo of the tree being analyzed.
+        """
+        leaves  = {}
+        shape   = []
+        lexical = []
+        nps     = self.classified(clause, candidates, memo) if candidates is not None else None
+
+        stack = [clause]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                shape.append(")")
+                continue
+
+            if not isinstance(node, Tree):
+                # Words are numbered in order of first appearance
+                word = leaves.setdefault(node, len(leaves))
+                if node.lower() in self.tokens:
+                    shape.append("%i:%s" % (word, node.lower()))
+                else:
+                    shape.append("%i" % word)
+                continue
+
+            shape.append("(" + node.node)
+            if node.node == "NP" and (nps is None or id(node) in nps):
+                lexical.append(self.classify(node))
+
+            stack.append(None)
+            stack.extend(reversed(node))
+
+        return (vp.headtext().lower(), self.path(vp, clause), " ".join(shape), tuple(lexical))
+
+    def classified(self, clause, candidates, memo=None):
+        """
+        The ids of the noun phrases of the clause that a somebody or
+        bodypart predicate of one of the candidate templates is checked on.
+        The candidates are decided by the head text of the verb phrase,
+        and the bindings of their verbmaps by the shape of the clause, so
+        the noun phrases to classify are the same for every clause with
+        the same key.
+        """
+        templates = [template for template in candidates if template in self.classifying]
+        if not templates:
+            return frozenset()
+
+        templates = self.templates.admissible(clause, templates, memo)
+        bindings  = self.templates.trie.bindings(clause, templates, memo)
+
+        nps = set()
+        for template in templates:
+            for phrase, predicates in bindings[template]:
+                if any(predicate.name in CLASSIFIERS for predicate in predicates or ()):
+                    nps.add(id(phrase))
+        return nps
+
+    def classify(self, np):
+        """
+        The classification of the head of a noun phrase by the classifiers
+        of the somebody and bodypart predicates.
+        """
+        head = np.head()
+        if head is None:
+            return None
+
+        text = head.text()
+        try:
+            return self.lexical[text]
+        except KeyError:
+            classes = self.lexical[text] = tuple(self.lexicalmatch(np, classifier) for classifier in self.classifiers)
+            return classes
+
+    def get(self, key, clause):
+        """
+        Returns the match cached for the key, rebound to the phrases of the
+        clause, None if no template matched, or ``MISSING``.
+        """
+        try:
+            cached = self.cache[key]
+        except KeyError:
+            return MISSING
+
+        if cached is None:
+            return None
+
+        template, senses, paths = cached
+        return TemplateMatch(template, senses, tuple(self.rebind(clause, path) for path in paths))
+
+    def put(self, key, clause, match):
+        """
+        Caches the match (or None) chosen for the key.
+        """
+        if match is None:
+            self.cache[key] = None
+        else:
+            paths = tuple(self.path(constituent, clause) for constituent in match.constituents)
+            self.cache[key] = (match.template, match.senses, paths)
+
+    @staticmethod
+    def path(phrase, clause):
+        """
+        The child indices leading from the clause down to the phrase.
+        """
+        path = []
+        while phrase is not clause:
+            path.append(phrase.parent_index())
+            phrase = phrase._parent
+        return tuple(reversed(path))
+
+    @staticmethod
+    def rebind(clause, path):
+        phrase = clause
+        for idx in path:
+            phrase = phrase[idx]
+        return phrase
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.cache)
@@ -32,6 +32,43 @@ __docformat__ = "restructuredtext en"
 from nltk.tree import Tree, AbstractParentedTree
 from nltk.corpus import wordnet as wn
 
+from utils import WORDNET_LOCK
+
+##########################################################################
+## Module Static Variables
+##########################################################################
+
+# Tags that mark the head of a noun phrase as a person
+PERSON_TAGS = ("NNP", "NNPS", "PRP", "PRO")
+
+# Closed lists of words standing in for WordNet classifiers in the fast
+# analysis profile, keyed by the classifier that they stand in for.
+CLASSIFIER_WORDS = {
+    'animal.n.01': frozenset([
+        'i', 'me', 'you', 'he', 'him', 'she', 'her', 'we', 'us', 'they', 'them',
+        'myself', 'yourself', 'himself', 'herself', 'ourselves', 'yourselves',
+        'themselves', 'who', 'whom', 'whoever', 'someone', 'somebody', 'anyone',
+        'anybody', 'everyone', 'everybody', 'nobody', 'one',
+        'man', 'men', 'woman', 'women', 'person', 'persons', 'people', 'child',
+        'children', 'kid', 'kids', 'boy', 'boys', 'girl', 'girls', 'baby',
+        'babies', 'mother', 'father', 'parent', 'parents', 'brother', 'sister',
+        'son', 'daughter', 'wife', 'husband', 'friend', 'friends', 'family',
+        'teacher', 'student', 'students', 'doctor', 'nurse', 'secretary',
+        'officer', 'police', 'soldier', 'soldiers', 'worker', 'workers',
+        'president', 'minister', 'leader', 'official', 'officials', 'king',
+        'queen', 'lady', 'gentleman', 'guy', 'dog', 'cat', 'horse', 'bird',
+        'animal', 'animals',
+    ]),
+    'body_part.n.01': frozenset([
+        'head', 'face', 'eye', 'eyes', 'ear', 'ears', 'nose', 'mouth', 'lip',
+        'lips', 'tooth', 'teeth', 'tongue', 'neck', 'throat', 'shoulder',
+        'shoulders', 'arm', 'arms', 'elbow', 'wrist', 'hand', 'hands', 'finger',
+        'fingers', 'thumb', 'chest', 'breast', 'back', 'stomach', 'belly', 'hip',
+        'leg', 'legs', 'knee', 'knees', 'ankle', 'foot', 'feet', 'toe', 'toes',
+        'skin', 'hair', 'heart', 'brain', 'lung', 'lungs', 'bone', 'bones',
+    ]),
+}
+
 ##########################################################################
 ## Base Phrase Explorer
 ##########################################################################
@@ -106,29 +143,12 @@ class BasePhrase(AbstractParentedTree):
         ..  warning:: This method cannot be used in conjunction with 
             ``Tree.parse``, pass a string into init to parse it.
         """
-        classmap = {
-            "CL":   ClausePhrase,
-            "NP":   NounPhrase,
-            "VP":   VerbPhrase,
-            "PP":   PrepPhrase,
-            "ADJP": AdjPhrase,
-            "N":    TokenPhrase,
-            "V":    TokenPhrase,
-            "ADJ":  TokenPhrase,
-            "ADV":  TokenPhrase,
-            "CONJ": TokenPhrase,
-            "DET":  TokenPhrase,
-            "PRO":  TokenPhrase,
-            "TO":   TokenPhrase,
-            "PREP": TokenPhrase,
-        }   
-
         if isinstance(tree, Tree):
             children = [klass.convert(child) for child in tree]
-            if tree.node not in classmap:
+            if tree.node not in PHRASE_TYPES:
                 return klass(tree.node, children)
             else:
-                return classmap[tree.node](tree.node, children)
+                return PHRASE_TYPES[tree.node](tree.node, children)
         else:
             return tree
 
@@ -144,7 +164,6 @@ class BasePhrase(AbstractParentedTree):
 
                 self[idx] = BasePhrase.convert(child)
 
-        self._bits  = None                  # Temporary object
         self._frame = None                  # Temporary object
 
     #/////////////////////////////////////////////////////////////////////
@@ -345,7 +364,8 @@ class BasePhrase(AbstractParentedTree):
             with a particular parse tree. This is why the crush bits and
             functional helper functions are inside of this method.
 
-        :todo: Remove the bits part to somewhere sane.
+        ..  note:: The tree is not modified; the functional annotations of
+            the pattern are compiled and checked by ``wim.frame``.
 
         :param pattern: An ``nltk.tree.Tree`` with leaves to match on.
         :type pattern: ``Tree``
@@ -354,9 +374,6 @@ class BasePhrase(AbstractParentedTree):
         :rtype: ``generator``
         """
 
-        def gather_bits(value):
-            return value.split("=")[1]
-
         def crush_bits(value):
             return value.split("=")[0]
 
@@ -369,9 +386,6 @@ class BasePhrase(AbstractParentedTree):
                 idx += 1
                 if crush_bits(child.node) == mychild.node: 
 
-                    if functional(child.node):
-                        mychild._bits = gather_bits(child.node)
-
                     if child.height() == 1:
                         yield mychild
                         break
@@ -599,13 +613,27 @@ class NounPhrase(BasePhrase):
         """
         head = self.head()
         
-        tags = ("NNP", "NNPS", "PRP", "PRO")
-        for tag in tags:
+        for tag in PERSON_TAGS:
             if head.find(tag) is not None:
                 return True
 
         return self.synmatch('animal.n.01')
 
+    def tagsomebody(self, *args):
+        """
+        The fast profile's ``somebody``, which decides from the tags of the
+        head noun and ``wordmatch`` only, without consulting WordNet.
+
+        :rtype: ``bool``
+        """
+        head = self.head()
+
+        for tag in PERSON_TAGS:
+            if head.find(tag) is not None:
+                return True
+
+        return self.wordmatch('animal.n.01')
+
     def possesive(self, *args):
         """
         Checks if the NounPhrase is possesive by checking if a POS tag
@@ -623,6 +651,15 @@ class NounPhrase(BasePhrase):
         """
         return self.synmatch('body_part.n.01')
 
+    def tagbodypart(self, *args):
+        """
+        The fast profile's ``bodypart``, which checks the head noun against
+        a closed list of body parts instead of WordNet.
+
+        :rtype: ``bool``
+        """
+        return self.wordmatch('body_part.n.01')
+
     def subject(self, verbphrase):
         """
         Checks if this particular nounphrase is the subject of the passed
@@ -670,11 +707,32 @@ class NounPhrase(BasePhrase):
 
         :rtype: ``bool``
         """
-        classifier = wn.synset(classifier)
-        for synset in wn.synsets(self.head().text(), pos=wn.NOUN):
-            if synset.path_similarity(classifier) >= 0.2:
+        text = self.head().text()
+        with WORDNET_LOCK:
+            classifier = wn.synset(classifier)
+            synsets    = wn.synsets(text, pos=wn.NOUN)
+
+            # Reads every hypernym into the reader's cache, so that the
+            # similarities can be computed without holding the lock.
+            for synset in [classifier] + synsets:
+                synset.hypernym_distances()
+
+        # The noun taxonomy has a single root, so none is simulated; that
+        # also keeps path_similarity from reading the WordNet version.
+        for synset in synsets:
+            if synset.path_similarity(classifier, simulate_root=False) >= 0.2:
                 return True
         return False
+
+    def wordmatch(self, classifier):
+        """
+        A heuristic stand in for ``synmatch`` that checks if the text of
+        the head of the phrase is in the closed list of words for the
+        classifier in ``CLASSIFIER_WORDS``.
+
+        :rtype: ``bool``
+        """
+        return self.head().text().lower() in CLASSIFIER_WORDS.get(classifier, ())
         
     def rootNPs(self):
         """
@@ -791,18 +849,16 @@ class VerbPhrase(BasePhrase):
         :returns: A list of the constituents matched by the verbmap
         :rtype: ``list(BasePhrase)``
 
-        ..  note:: Couldn't use sets or return a set because phrases are
-            unhashable... 
-
-        :todo: Make phrases hashable in order to use the set method.
+        ..  note:: Phrases are unhashable, so uniqueness is tracked by the
+            identity of the phrases rather than deep tree comparison.
         """
         clause = self.findparent('CL')
-        # Coudn't use set because phrases are unhashable... 
-        #return set(list(clause.pattern_search(verbmap)))
 
+        seen    = set()
         uniques = []
         for item in clause.pattern_search(verbmap):
-            if item not in uniques:
+            if id(item) not in seen:
+                seen.add(id(item))
                 uniques.append(item)
         return uniques
 
@@ -982,6 +1038,28 @@ class TokenPhrase(BasePhrase):
         string = string.strip('"')
         return self.text().lower() == string.lower()
 
+##########################################################################
+## Phrase Types
+##########################################################################
+
+# Maps the node of a tree onto the phrase type that it is converted to
+PHRASE_TYPES = {
+    "CL":   ClausePhrase,
+    "NP":   NounPhrase,
+    "VP":   VerbPhrase,
+    "PP":   PrepPhrase,
+    "ADJP": AdjPhrase,
+    "N":    TokenPhrase,
+    "V":    TokenPhrase,
+    "ADJ":  TokenPhrase,
+    "ADV":  TokenPhrase,
+    "CONJ": TokenPhrase,
+    "DET":  TokenPhrase,
+    "PRO":  TokenPhrase,
+    "TO":   TokenPhrase,
+    "PREP": TokenPhrase,
+}
+
 ##########################################################################
 ## Main Method for Testing and Demonstration
 ##########################################################################
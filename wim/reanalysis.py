@@ -0,0 +1,92 @@
+# wim.reanalysis
+# Wim: Incremental Reanalysis
+#
+# Author:  Jesse English <jesse@unboundconcepts.com>
+#          Benjamin Bengfort <benjamin@unboundconcepts.com>
+# URL:     <http://unboundconcepts.com/projects/wim/>
+# Created: Mon Jan 21 10:14:37 2013 -0400
+#
+# Copyright (C) 2012 Unbound Concepts
+# For license information, see LICENSE.TXT
+#
+# ID: reanalysis.py [1] benjamin@unboundconepts.com $
+
+"""
+Reanalysis of a corpus after the knowledge changes, repeating only the
+analyses that the change can affect. The WIM of a tree is decided by the
+candidate templates of each of its verb phrases; every other input is the
+same from one version of the knowledge to the next. So the provenance of
+a WIM records the digests of the candidates of every verb phrase, and a
+WIM is current under new knowledge as long as it was analyzed with the
+same configuration (``WIMAnalyzer.signature``) and every verb phrase has
+the same candidates, in the same order, when its head is resolved
+against the new templates. Resolving a head is a lexicon lookup, so deciding
+which WIMs are stale costs next to nothing compared to analyzing them.
+"""
+
+__docformat__ = "restructuredtext en"
+
+##########################################################################
+## Imports and Package Dependencies
+##########################################################################
+
+from itertools import izip
+
+from analyze import WIMAnalyzer, analyze_stream
+
+##########################################################################
+## Incremental Reanalysis
+##########################################################################
+
+def stale(provenance, analyzer, heads=None, candidates=True):
+    """
+    Returns True if the WIM with the provenance may differ when analyzed
+    by the analyzer, i.e. if it was analyzed by an analyzer with another
+    signature, the candidates of one of its verb phrases have changed, or
+    the WIM has no provenance.
+
+    :param heads: A dictionary memoizing the candidate digests of heads.
+    :param candidates: If False, the candidates are known not to have
+        changed, and only the signature is compared.
+    """
+    if provenance is None or provenance.get('signature') != analyzer.signature:
+        return True
+    if not candidates:
+        return False
+
+    heads = heads if heads is not None else {}
+    for record in provenance['phrases']:
+        if record.get('skipped'): continue
+
+        head = record['head']
+        if head not in heads:
+            heads[head] = [template.digest for template in analyzer.candidates(head)]
+        if heads[head] != record['candidates']:
+            return True
+    return False
+
+def reanalyze(lines, records, analyzer=None, diff=None):
+    """
+    Pairs every flattened parse in lines with its record from an earlier
+    run of ``analyze_stream`` with provenance, and yields the record again
+    if it is still current, or else a new record for the parse analyzed
+    by the analyzer, along with whether it was reanalyzed. Records without
+    provenance, and truncated ones, are always reanalyzed.
+
+    :param diff: The ``Knowledge.diff`` of the knowledge of the records
+        and of the analyzer, if known; no frame changing means that every
+        complete record analyzed with the same signature is current.
+    """
+    analyzer = analyzer or WIMAnalyzer()
+    heads    = {}
+    changed  = diff is None or any(diff.values())
+
+    for line, record in izip(lines, records):
+        budget = record.get('wim_budget') or {}
+        if not budget.get('truncated'):
+            if not stale(record.get('wim_provenance'), analyzer, heads, changed):
+                yield record, False
+                continue
+
+        update, = analyze_stream([line], analyzer, record['index'], provenance=True)
+        yield update, True
@@ -1,6 +1,12 @@
+import os
 import importlib
+import threading
 import nltk.tree
 
+# The WordNet reader seeks and reads shared data files and fills shared
+# caches, so every thread must hold this lock while it calls into WordNet.
+WORDNET_LOCK = threading.RLock()
+
 def class_from_string(klass):
     parts = klass.split('.')
     name  = parts[-1]
@@ -24,3 +30,26 @@ def flatten_tree_string(tree_or_str):
         tree = tree.replace('  ', ' ')
 
     return tree
+
+def memory_usage(pid='self'):
+    """
+    Returns the resident memory of a process in kB, split into the pages
+    that are shared with other processes (e.g. copy-on-write pages that a
+    forked worker still shares with its parent) and the private pages.
+    Reads /proc, so only works on Linux.
+    """
+    path = '/proc/%s/smaps_rollup' % pid
+    if not os.path.exists(path):
+        path = '/proc/%s/smaps' % pid
+
+    usage = {'rss': 0, 'shared': 0, 'private': 0}
+    with open(path) as smaps:
+        for line in smaps:
+            parts = line.split()
+            if parts[0] == 'Rss:':
+                usage['rss'] += int(parts[1])
+            elif parts[0] in ('Shared_Clean:', 'Shared_Dirty:'):
+                usage['shared'] += int(parts[1])
+            elif parts[0] in ('Private_Clean:', 'Private_Dirty:'):
+                usage['private'] += int(parts[1])
+    return usage
@@ -2,6 +2,10 @@
 
 __docformat__ = "restructuredtext en"
 
+import threading
+
+from collections import OrderedDict
+
 class DefaultDict(dict):
     """
     A version of collections.defaultdict that is implemented in Python.
@@ -96,3 +100,90 @@ class BucketDict(DefaultDict):
     """
 
     default_factory = list
+
+class LRUCache(object):
+    """
+    A bounded mapping that evicts the least recently used key once the
+    capacity is exceeded. Every lookup with ``__getitem__`` or ``get`` is
+    counted as either a hit or a miss so that the effectiveness of the
+    cache can be monitored. The cache is safe to share between threads.
+
+    :ivar capacity: The maximum number of keys held by the cache.
+    :type capacity: ``int``
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError("The capacity of the cache must be positive")
+        self.capacity = capacity
+        self.hits     = 0
+        self.misses   = 0
+        self._data    = OrderedDict()
+        self._lock    = threading.RLock()
+
+    @property
+    def hit_rate(self):
+        """
+        The fraction of lookups that were answered by the cache.
+
+        :rtype: ``float``
+        """
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return float(self.hits) / total
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        """
+        Empties the cache and resets the hit and miss counters.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits   = 0
+            self.misses = 0
+
+    def items(self):
+        """
+        The cached items from least to most recently used.
+        """
+        with self._lock:
+            return self._data.items()
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                raise
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __repr__(self):
+        return '%s(capacity=%i, hits=%i, misses=%i)' % (self.__class__.__name__,
+                                                       self.capacity,
+                                                       self.hits,
+                                                       self.misses)
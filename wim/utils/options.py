@@ -0,0 +1,76 @@
+# wim.utils.options
+# Wim: Analyzer Command Line Options
+#
+# Author:  Jesse English <jesse@unboundconcepts.com>
+#          Benjamin Bengfort <benjamin@unboundconcepts.com>
+# URL:     <http://unboundconcepts.com/projects/wim/>
+# Created: Tue Jan 22 11:05:18 2013 -0400
+#
+# Copyright (C) 2012 Unbound Concepts
+# For license information, see LICENSE.TXT
+#
+# ID: options.py [1] benjamin@unboundconepts.com $
+
+"""
+The command line options that configure a ``WIMAnalyzer``, shared by the
+console programs that analyze, so that a corpus can be reanalyzed with
+exactly the configuration it was first analyzed with.
+"""
+
+__docformat__ = "restructuredtext en"
+
+##########################################################################
+## Imports and Package Dependencies
+##########################################################################
+
+from optparse import make_option
+
+from wim.analyze import AUXILIARIES
+from wim.wimcache import CACHE_PATH
+
+##########################################################################
+## Analyzer Options
+##########################################################################
+
+def split_list(value):
+    """
+    Splits a comma separated option value into a list, or None if empty.
+    """
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()] or None
+
+ANALYZER_OPTIONS = (
+    make_option('-t', '--timeout', metavar='SECS', default=None, dest='timeout', action='store', type='float',
+        help='Truncate the analysis of a sentence that takes longer than SECS seconds'),
+    make_option('-m', '--max-trials', metavar='INT', default=None, dest='max_trials', action='store', type='int',
+        help='Truncate the analysis of a sentence after INT template trials'),
+    make_option('-w', '--wimcache', metavar='PATH', default=None, dest='wimcache', action='store',
+        help='Reuse the WIMs of trees analyzed before from the cache at PATH (defaults to $WIMCACHE)'),
+    make_option('-f', '--profile', metavar='PROFILE', default=None, dest='profile', action='store',
+        choices=('accurate', 'fast'), help='Set the analysis profile, accurate (the default) or fast'),
+    make_option('-r', '--relations', metavar='LIST', default=None, dest='relations', action='store',
+        help='Only add the comma separated relations, e.g. AGENT,THEME, to the WIMs'),
+    make_option('-l', '--lemmas', metavar='LIST', default=None, dest='lemmas', action='store',
+        help='Only analyze the verb phrases with the comma separated head lemmas'),
+    make_option('-x', '--consumed', default=False, dest='consumed', action='store_true',
+        help='Skip the verb phrases bound as constituents by an earlier match'),
+    make_option('-a', '--auxiliaries', default=False, dest='auxiliaries', action='store_true',
+        help='Skip the verb phrases governed by auxiliary and modal verbs'),
+)
+
+def analyzer_options(opts):
+    """
+    Converts the parsed ``ANALYZER_OPTIONS`` into the keyword arguments
+    of a ``WIMAnalyzer``.
+    """
+    return {
+        'timeout': opts.get('timeout', None),
+        'max_trials': opts.get('max_trials', None),
+        'wimcache': opts.get('wimcache', None) or CACHE_PATH,
+        'profile': opts.get('profile', None),
+        'relations': split_list(opts.get('relations', None)),
+        'lemmas': split_list(opts.get('lemmas', None)),
+        'consumed': opts.get('consumed', False),
+        'auxiliaries': AUXILIARIES if opts.get('auxiliaries', False) else None,
+    }
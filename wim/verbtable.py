@@ -0,0 +1,243 @@
+# wim.verbtable
+# Wim: Compiled Verb Table
+#
+# Author:  Jesse English <jesse@unboundconcepts.com>
+#          Benjamin Bengfort <benjamin@unboundconcepts.com>
+# URL:     <http://unboundconcepts.com/projects/wim/>
+# Created: Tue Jan 08 14:20:05 2013 -0400
+#
+# Copyright (C) 2012 Unbound Concepts
+# For license information, see LICENSE.TXT
+#
+# ID: verbtable.py [1] benjamin@unboundconepts.com $
+
+"""
+An offline build step that walks every WordNet verb lemma once, resolves
+the frames of each of its senses against the knowledge, and writes a
+compact table that maps lemma to sense to template ids. The table is
+memory mapped by ``VerbTable``, which resolves head text exactly as
+``wn.synsets`` would (including morphy and the verb exception list) but
+without any WordNet I/O.
+
+The table is a sorted text file so that it can be binary searched in
+place; the first line holds the byte offsets of its sections::
+
+    #wimtable 1 <exceptions offset> <lemmas offset> <end offset>
+    ["Something ----s", ...]                   (frame ids index this)
+    form<TAB>base base                         (verb exceptions, sorted)
+    lemma<TAB>synset lemma id,id<TAB>...       (verb lemmas, sorted)
+"""
+
+__docformat__ = "restructuredtext en"
+
+##########################################################################
+## Imports and Package Dependencies
+##########################################################################
+
+import os
+import json
+import mmap
+
+from frame import VerbTemplate
+from lexicon import VerbLexicon, VerbSense, DEFAULT_CAPACITY, SUBSTITUTIONS
+
+##########################################################################
+## Module Static Variables
+##########################################################################
+
+TABLE_FORMAT  = 1
+TABLE_HEADER  = "#wimtable %i %010i %010i %010i\n"
+
+##########################################################################
+## Table Construction
+##########################################################################
+
+def build(path, templates=None):
+    """
+    Walks every verb lemma in WordNet and writes the verb table to path.
+
+    ..  note:: The lemma index and synset offsets are read from the
+        WordNet reader directly so that the table holds exactly the
+        synsets, in exactly the order, that ``wn.synsets`` returns.
+
+    :param path: The path to write the verb table to.
+    :param templates: The ``TemplateIndex`` to resolve frames against.
+
+    :returns: The number of lemmas written to the table.
+    :rtype: ``int``
+    """
+    from nltk.corpus import wordnet as wn
+
+    templates = templates or VerbTemplate.knowledge.templates
+    frames    = sorted(templates)
+    ids       = dict((frame, idx) for idx, frame in enumerate(frames))
+
+    exceptions = []
+    for line in wn.open('verb.exc'):
+        terms = line.split()
+        if terms:
+            exceptions.append("%s\t%s\n" % (terms[0], " ".join(terms[1:])))
+    exceptions.sort()
+
+    lemmas = []
+    for name, index in wn._lemma_pos_offset_map.items():
+        if wn.VERB not in index: continue
+
+        senses = []
+        for offset in index[wn.VERB]:
+            synset = wn._synset_from_pos_and_offset(wn.VERB, offset)
+            for lemma in synset.lemmas:
+                tids = []
+                for frameid in lemma.frame_ids:
+                    mappings = templates.byid[frameid]
+                    if mappings is not None:
+                        tids.append(str(ids[mappings[0].frame]))
+                if tids:
+                    senses.append("%s %s %s" % (synset.name, lemma.name, ",".join(tids)))
+
+        lemmas.append("\t".join([name] + senses) + "\n")
+    lemmas.sort()
+
+    head = json.dumps(frames) + "\n"
+    exc  = "".join(exceptions)
+    lem  = "".join(lemmas)
+
+    offset = len(TABLE_HEADER % (TABLE_FORMAT, 0, 0, 0)) + len(head)
+    header = TABLE_HEADER % (TABLE_FORMAT, offset, offset + len(exc), offset + len(exc) + len(lem))
+
+    tmppath = path + '.tmp'
+    with open(tmppath, 'wb') as table:
+        table.write(header)
+        table.write(head)
+        table.write(exc)
+        table.write(lem)
+    os.rename(tmppath, path)
+
+    return len(lemmas)
+
+##########################################################################
+## Table Resolution
+##########################################################################
+
+class VerbTable(VerbLexicon):
+    """
+    A ``VerbLexicon`` that resolves head text against a memory mapped verb
+    table built with ``build`` instead of WordNet. Resolutions are still
+    held in the LRU cache, but a miss costs a handful of binary searches
+    over the mapped pages rather than WordNet file seeks, and the pages
+    are shared between processes that map the same table.
+    """
+
+    def __init__(self, table, templates=None, capacity=DEFAULT_CAPACITY):
+        super(VerbTable, self).__init__(templates, capacity)
+        self.table = table
+
+        with open(table, 'rb') as tfile:
+            self._data = mmap.mmap(tfile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = self._data.readline().split()
+        if header[0] != "#wimtable" or int(header[1]) != TABLE_FORMAT:
+            raise ValueError("%s is not a version %i verb table" % (table, TABLE_FORMAT))
+
+        self._excsection = (int(header[2]), int(header[3]))
+        self._verbexc    = None
+        self._lemsection = (int(header[3]), int(header[4]))
+
+        # Map template ids back onto the compiled templates
+        frames = json.loads(self._data.readline())
+        self._templates = [self.templates.get(frame) for frame in frames]
+
+    def lookup(self, text):
+        """
+        Resolves the head text against the table, bypassing the cache.
+        The text is lowercased first, as ``wn.synsets`` does.
+
+        :rtype: ``tuple(VerbSense)``
+        """
+        senses = []
+        for form in self.morphy(text.lower()):
+            for sense in self._search(self._lemsection, form).split("\t")[1:]:
+                synset, lemma, tids = sense.split(" ")
+                templates = [self._templates[int(tid)] for tid in tids.split(",")]
+                templates = tuple(template for mappings in templates if mappings is not None
+                                  for template in mappings)
+                if templates:
+                    senses.append(VerbSense(synset, lemma, templates))
+        return tuple(senses)
+
+    def exceptions(self):
+        """
+        The verb exception list of the table.
+        """
+        if self._verbexc is None:
+            start, end = self._excsection
+            exceptions = {}
+            for line in self._data[start:end].splitlines():
+                form, bases = line.split("\t")
+                exceptions[form] = tuple(bases.split())
+            self._verbexc = exceptions
+        return self._verbexc
+
+    def morphy(self, form):
+        """
+        Returns the verb lemmas in the table for an inflected form, in the
+        same order as WordNet's morphy.
+
+        :rtype: ``list(basestring)``
+        """
+
+        def apply_rules(forms):
+            return [form[:-len(old)] + new
+                    for form in forms
+                    for old, new in SUBSTITUTIONS
+                    if form.endswith(old)]
+
+        def filter_forms(forms):
+            result = []
+            for form in forms:
+                if form not in result and self._search(self._lemsection, form) is not None:
+                    result.append(form)
+            return result
+
+        exceptions = self._search(self._excsection, form)
+        if exceptions is not None:
+            return filter_forms([form] + exceptions.split("\t")[1].split())
+
+        forms   = apply_rules([form])
+        results = filter_forms([form] + forms)
+        if results:
+            return results
+
+        while forms:
+            forms   = apply_rules(forms)
+            results = filter_forms(forms)
+            if results:
+                return results
+        return []
+
+    def _search(self, section, key):
+        """
+        Binary searches a sorted section of the table for the line whose
+        first field is key, returning the line or None.
+        """
+        data   = self._data
+        lo, hi = section
+
+        while lo < hi:
+            mid   = (lo + hi) // 2
+            start = data.rfind("\n", lo, mid)
+            start = lo if start < 0 else start + 1
+            end   = data.find("\n", start, hi)
+            line  = data[start:end]
+            field = line.split("\t", 1)[0]
+
+            if field == key:
+                return line
+            elif field < key:
+                lo = end + 1
+            else:
+                hi = start
+        return None
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (self.__class__.__name__, self.table, self.cache)
@@ -0,0 +1,224 @@
+# wim.wimcache
+# Wim: Persistent WIM Result Cache
+#
+# Author:  Jesse English <jesse@unboundconcepts.com>
+#          Benjamin Bengfort <benjamin@unboundconcepts.com>
+# URL:     <http://unboundconcepts.com/projects/wim/>
+# Created: Fri Jan 18 09:26:51 2013 -0400
+#
+# Copyright (C) 2012 Unbound Concepts
+# For license information, see LICENSE.TXT
+#
+# ID: wimcache.py [1] benjamin@unboundconepts.com $
+
+"""
+A content addressed cache of analyzed WIMs on disk. Corpora repeat whole
+sentences (boilerplate, quotations, syndicated stories) and a corpus is
+often analyzed again after a crash or a change of configuration, so the
+WIM of every tree is stored under a key that is a digest of everything
+that decides it:
+
+    - the canonical flattened tree
+    - the version of the knowledge (``Knowledge.version``)
+    - the version of WordNet
+    - the signature of the analyzer, i.e. its profile and policies
+
+The cache is an SQLite database, so it can be shared by every process
+analyzing a corpus, and it is bounded in size: once the pickled WIMs it
+holds grow past its capacity, the least recently used are evicted.
+"""
+
+__docformat__ = "restructuredtext en"
+
+##########################################################################
+## Imports and Package Dependencies
+##########################################################################
+
+import os
+import sys
+import time
+import cPickle
+import sqlite3
+import hashlib
+import threading
+
+from cStringIO import StringIO
+from nltk.corpus import wordnet as wn
+
+from frame import VerbTemplate
+from utils import flatten_tree_string, WORDNET_LOCK
+
+##########################################################################
+## Module Static Variables
+##########################################################################
+
+DEFAULT_SIZE = 256 * 1024 * 1024   # Bytes of pickled WIMs
+CACHE_PATH   = os.environ.get('WIMCACHE', None)
+
+# Evictions bring the cache down to this fraction of its capacity
+EVICTION_LOW = 0.9
+
+# The only globals that a cached WIM may refer to when it is loaded
+WIM_GLOBALS  = frozenset([
+    ('wim.base', 'WIM'),
+    ('wim.base', 'WIMFrame'),
+    ('wim.base', 'WIMProperty'),
+])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wims (
+    key      TEXT PRIMARY KEY,
+    wim      BLOB NOT NULL,
+    size     INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS wims_accessed ON wims (accessed);
+"""
+
+##########################################################################
+## WIM Cache
+##########################################################################
+
+class WIMCache(object):
+    """
+    A persistent cache of WIMs keyed by the digest returned by ``key``.
+    A single cache can be used from many threads, and from processes that
+    were forked after it was opened, each of which opens its own
+    connection to the database.
+
+    :ivar path: The path of the SQLite database.
+    :ivar capacity: The size in bytes that the pickled WIMs may grow to.
+    """
+
+    def __init__(self, path, capacity=DEFAULT_SIZE, knowledge=None):
+        self.path      = path
+        self.capacity  = capacity
+        self.knowledge = knowledge or VerbTemplate.knowledge
+        self.hits      = 0
+        self.misses    = 0
+
+        self._lock     = threading.Lock()
+        self._pid      = None
+        self._conn     = None
+        self._size     = None
+
+        with WORDNET_LOCK:
+            self.wordnet = wn.get_version()
+
+    @property
+    def connection(self):
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            self._conn.text_factory = str
+            self._conn.executescript(SCHEMA)
+            self._pid  = os.getpid()
+            self._size = None
+        return self._conn
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if not lookups: return 0.0
+        return float(self.hits) / lookups
+
+    def key(self, tree, signature=""):
+        """
+        The key of a tree (a tree string or ``nltk.tree.Tree``) analyzed
+        by an analyzer with the signature.
+        """
+        digest = hashlib.sha1()
+        for part in (flatten_tree_string(tree), self.knowledge.version, self.wordnet, signature):
+            if isinstance(part, unicode):
+                part = part.encode('utf8')
+            digest.update(part)
+            digest.update("\0")
+        return digest.hexdigest()
+
+    def get(self, key, default=None):
+        """
+        Returns the WIM cached under the key, or default. The WIMs are
+        pickled, and may only refer to the classes in ``WIM_GLOBALS``, so
+        that a tampered or shared cache can't run code when it is read; a
+        WIM that refers to anything else is a miss, and is replaced the
+        next time the tree is analyzed.
+        """
+        with self._lock:
+            conn = self.connection
+            row  = conn.execute("SELECT wim FROM wims WHERE key = ?", (key,)).fetchone()
+            wim  = self.loads(str(row[0])) if row is not None else None
+            if wim is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            with conn:
+                conn.execute("UPDATE wims SET accessed = ? WHERE key = ?", (time.time(), key))
+        return wim
+
+    @staticmethod
+    def loads(data):
+        """
+        Unpickles a cached WIM, or returns None if the data refers to a
+        global that is not in ``WIM_GLOBALS`` or is not a pickle at all.
+        """
+        unpickler = cPickle.Unpickler(StringIO(data))
+        unpickler.find_global = _find_global
+        try:
+            return unpickler.load()
+        except (cPickle.UnpicklingError, EOFError, ValueError):
+            return None
+
+    def put(self, key, wim):
+        """
+        Caches the WIM under the key, evicting the least recently used
+        WIMs if the cache has grown past its capacity.
+        """
+        data = cPickle.dumps(wim, cPickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            conn = self.connection
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO wims (key, wim, size, accessed) VALUES (?, ?, ?, ?)",
+                             (key, sqlite3.Binary(data), len(data), time.time()))
+
+            # Other processes write to the cache too, so the size is only
+            # an estimate until it is recounted before evicting.
+            self._size = (self._size if self._size is not None else self.size()) + len(data)
+            if self._size > self.capacity:
+                self.evict()
+
+    def size(self):
+        """
+        The size in bytes of the pickled WIMs in the cache.
+        """
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM wims").fetchone()[0]
+
+    def evict(self, target=None):
+        """
+        Evicts the least recently used WIMs until the cache is no bigger
+        than target bytes, by default a fraction of its capacity.
+        """
+        target = target if target is not None else int(self.capacity * EVICTION_LOW)
+        conn   = self.connection
+        size   = self.size()
+        if size > target:
+            keys = []
+            for key, length in conn.execute("SELECT key, size FROM wims ORDER BY accessed").fetchall():
+                if size <= target: break
+                keys.append((key,))
+                size -= length
+            with conn:
+                conn.executemany("DELETE FROM wims WHERE key = ?", keys)
+        self._size = size
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM wims").fetchone()[0]
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
+
+def _find_global(module, name):
+    if (module, name) not in WIM_GLOBALS:
+        raise cPickle.UnpicklingError("%s.%s is not allowed in a cached WIM" % (module, name))
+    __import__(module)
+    return getattr(sys.modules[module], name)